@@ -1,3 +1,5 @@
+import uuid
+
 import streamlit as st
 from chatbot import MBTIChatBot
 
@@ -14,6 +16,10 @@ st.title("MBTI Chatbot")
 # 1) 사이드바에서 MBTI 유형 선택
 selected_mbti = st.sidebar.selectbox("Select MBTI type", mbti_types, index=0)
 
+# 브라우저 세션마다 대화 기록을 따로 남기기 위한 id
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = uuid.uuid4().hex
+
 # 2) 세션 스테이트에 챗봇이 없으면 초기화
 if "chatbot" not in st.session_state:
     st.session_state["chatbot"] = MBTIChatBot(selected_mbti)
@@ -33,6 +39,7 @@ if st.session_state["chatbot"].mbti != selected_mbti:
     st.session_state["chatbot"].initialize_db()
 
     # 대화 내용을 모두 리셋(새로운 MBTI 시작)
+    st.session_state["session_id"] = uuid.uuid4().hex
     st.session_state["messages"] = [
         {
             "role": "assistant",
@@ -51,22 +58,22 @@ if user_input := st.chat_input("질문을 입력해주세요 :)"):
     st.chat_message("user").write(user_input)
     st.session_state["messages"].append({"role": "user", "content": user_input})
 
-    # [스트리밍 모드]로 챗봇의 응답 가져오기
-    response = st.session_state["chatbot"].get_response(user_input)
-
-    # 한 글자씩 받아서 출력할 자리(placeholder)
+    # [스트리밍 모드] LLM이 토큰을 만드는 대로 바로 받아서 출력
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
         streamed_text = ""
 
-        # spinner로 표시할 수도 있음
-        with st.spinner("생각 중..."):
-            for chunk in response:
-                streamed_text += chunk
-                # 매 chunk마다 placeholder를 업데이트하여 타이핑 효과
-                message_placeholder.write(streamed_text)
+        for chunk in st.session_state["chatbot"].stream_response(
+            user_input, st.session_state["session_id"]
+        ):
+            streamed_text += chunk
+            # 매 chunk마다 placeholder를 업데이트하여 타이핑 효과
+            message_placeholder.write(streamed_text)
+
+        timing = st.session_state["chatbot"].last_timing
+        st.caption(f"첫 토큰 {timing['ttft']:.2f}s · 전체 {timing['total']:.2f}s")
 
     # 스트리밍이 끝난 최종 응답을 messages에 저장
     st.session_state["messages"].append(
         {"role": "assistant", "content": streamed_text}
-    )
\ No newline at end of file
+    )
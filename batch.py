@@ -0,0 +1,213 @@
+"""
+질문 파일을 한 번에 답변하는 배치 모드.
+입력은 {"mbti": ..., "query": ...} 형태의 JSONL. mbti가 없는 레코드는 --mbti로 정한
+유형(들)에 대해 답변한다 ("all"이면 16개 유형 전부).
+결과는 끝나는 대로 출력 JSONL에 한 줄씩 쓰고, 이 파일이 그대로 체크포인트가 된다.
+중간에 끊겨도 다시 실행하면 이미 끝난 레코드는 건너뛴다.
+rate limit/타임아웃은 간격을 늘려 가며 다시 시도하고, 끝내 실패한 레코드는
+출력에 쓰지 않고 남겨 둬서 다음 실행 때 다시 처리된다.
+
+  python batch.py questions.jsonl answers.jsonl --mbti all --parallel 8 --rpm 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from config import MBTI_FEATURES
+
+EMBED_BATCH_SIZE = 256
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 2.0  # 초. 시도할 때마다 두 배
+
+
+def load_records(input_path, default_mbti=None, query_field="query"):
+    mbti_list = list(MBTI_FEATURES) if default_mbti == "all" else [default_mbti]
+    records = []
+    with open(input_path, encoding="utf-8") as f:
+        for lineno, line in enumerate(f):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            query = item.get(query_field)
+            if not query:
+                continue
+            base_id = item.get("id") or item.get("request_id") or str(lineno)
+            targets = [item["mbti"]] if item.get("mbti") else mbti_list
+            for mbti in targets:
+                if mbti is None:
+                    continue
+                if mbti.lower() not in MBTI_FEATURES:
+                    print(f"{input_path}:{lineno + 1}: 알 수 없는 MBTI 유형 {mbti!r}, 건너뜀", file=sys.stderr)
+                    continue
+                records.append({"key": f"{base_id}:{mbti}", "mbti": mbti.lower(), "query": query})
+    return records
+
+
+def load_done_keys(output_path):
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["key"])
+            except (json.JSONDecodeError, KeyError):
+                # 끊기면서 반쯤 쓰인 마지막 줄은 무시 (다시 처리됨)
+                continue
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class RateLimiter:
+    # 분당 요청 수 제한. 요청 사이 간격을 일정하게 벌린다.
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _is_retryable(error):
+    # openai를 직접 import하지 않고 429/타임아웃/일시적인 서버 오류인지 판단
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    return any(name in type(error).__name__ for name in ("RateLimit", "Timeout", "APIConnection"))
+
+
+async def _call_with_retry(label, make_coro, semaphore, limiter):
+    # 동시 실행 수/분당 요청 수 제한 안에서 호출하고, rate limit 등은 간격을 늘려 가며 다시 시도
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                await limiter.wait()
+                return await make_coro()
+        except Exception as e:
+            if attempt == MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = RETRY_BASE_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"{label}: {type(e).__name__}, {delay:.1f}s 후 재시도", file=sys.stderr)
+            await asyncio.sleep(delay)
+
+
+async def _prefetch_embeddings(bots, records, semaphore, limiter):
+    # 질문 임베딩을 큰 배치로 미리 만들어 두고, 답변할 때 검색에 그대로 넘김 ({질문: 벡터}).
+    # 어휘 fast path로 답할 질문은 임베딩이 필요 없으므로 뺌
+    queries = list(dict.fromkeys(
+        r["query"] for r in records if bots[r["mbti"]]._fast_path(r["query"]) is None
+    ))
+    embeddings = next(iter(bots.values())).embeddings
+    vectors = {}
+    for i in range(0, len(queries), EMBED_BATCH_SIZE):
+        batch = queries[i:i + EMBED_BATCH_SIZE]
+        try:
+            result = await _call_with_retry(
+                f"임베딩 배치 {i // EMBED_BATCH_SIZE}", lambda: embeddings.aembed_documents(batch),
+                semaphore, limiter,
+            )
+        except Exception as e:
+            # 미리 못 만든 질문은 답변할 때 하나씩 임베딩됨
+            print(f"임베딩 배치 {i // EMBED_BATCH_SIZE}: 실패 ({type(e).__name__}: {e})", file=sys.stderr)
+            continue
+        vectors.update(zip(batch, result))
+    return vectors
+
+
+async def run_batch(records, output_path, bot_factory=None, parallel=8, rpm=0):
+    if bot_factory is None:
+        from chatbot import MBTIChatBot
+
+        bot_factory = MBTIChatBot
+
+    done = load_done_keys(output_path)
+    pending = [r for r in records if r["key"] not in done]
+    print(f"전체 {len(records)}개 중 {len(records) - len(pending)}개 완료됨, {len(pending)}개 남음")
+    if not pending:
+        return
+
+    # 유형별로 묶어서 처리 (유형마다 챗봇/인덱스를 한 번만 준비)
+    by_type = {}
+    for record in pending:
+        by_type.setdefault(record["mbti"], []).append(record)
+
+    bots = {}
+    for mbti in by_type:
+        bots[mbti] = bot_factory(mbti)
+        bots[mbti].initialize_db()
+
+    semaphore = asyncio.Semaphore(parallel)
+    limiter = RateLimiter(rpm)
+    vectors = await _prefetch_embeddings(bots, pending, semaphore, limiter)
+    write_lock = asyncio.Lock()
+    finished = 0
+    failed = 0
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        # 끊긴 줄 뒤에 바로 이어 쓰지 않도록 줄바꿈부터 맞춤
+        if out.tell() and not _ends_with_newline(output_path):
+            out.write("\n")
+
+        def ask(record):
+            return bots[record["mbti"]].aget_response(
+                record["query"], use_history=False, query_embedding=vectors.get(record["query"])
+            )
+
+        async def answer(record):
+            nonlocal finished, failed
+            try:
+                response = await _call_with_retry(record["key"], lambda: ask(record), semaphore, limiter)
+            except Exception as e:
+                # 한 레코드 실패로 전체가 멈추지 않게 함. 출력에 안 쓰므로 다음 실행 때 다시 시도됨
+                failed += 1
+                print(f"{record['key']}: 실패 ({type(e).__name__}: {e})", file=sys.stderr)
+                return
+            async with write_lock:
+                out.write(json.dumps({**record, "response": response}, ensure_ascii=False) + "\n")
+                out.flush()
+                finished += 1
+                if finished % 10 == 0 or finished + failed == len(pending):
+                    elapsed = time.perf_counter() - start
+                    print(f"{finished}/{len(pending)} ({finished / elapsed:.1f} req/s)")
+
+        # 유형 순서대로 넣되, 유형 경계에서 멈추지 않도록 한 번에 gather
+        await asyncio.gather(*(answer(record) for group in by_type.values() for record in group))
+    if failed:
+        print(f"{failed}개 실패. 다시 실행하면 실패한 것만 다시 처리함")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 챗봇 배치 답변 생성")
+    parser.add_argument("input", help="입력 JSONL ({mbti, query})")
+    parser.add_argument("output", help="출력 JSONL (체크포인트 겸용)")
+    parser.add_argument(
+        "--mbti", type=str.lower, choices=[*MBTI_FEATURES, "all"],
+        help="mbti가 없는 레코드에 쓸 유형, all이면 전체",
+    )
+    parser.add_argument("--query-field", default="query", help="질문이 들어 있는 필드 이름")
+    parser.add_argument("--parallel", type=int, default=8, help="동시에 돌릴 LLM 호출 수")
+    parser.add_argument("--rpm", type=int, default=0, help="분당 최대 요청 수 (0이면 제한 없음)")
+    args = parser.parse_args()
+
+    records = load_records(args.input, args.mbti, args.query_field)
+    asyncio.run(run_batch(records, args.output, parallel=args.parallel, rpm=args.rpm))
@@ -0,0 +1,112 @@
+"""
+server.py 부하 테스트. 가짜 LLM/임베딩으로 16개 챗봇을 띄우고
+동시 요청을 보내 p50/p99 지연과 초당 요청 수를 출력한다.
+네트워크나 API 키 없이 돈다. 벡터 스토어는 임시 디렉터리에 가짜 임베딩으로 따로 만들고,
+요청마다 생긴 세션 기록 파일은 끝나고 지운다 (data/는 건드리지 않음).
+
+실행: python -m benchmarks.load_test --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from chatbot import MBTIChatBot
+from config import MBTI_FEATURES, TXT_PATHS
+from fakes import FakeChatModel, FakeEmbeddings
+from ingest import MANIFEST_NAME, file_hash, load_qa_documents, sync_documents
+from server import BotPool, ChatServer
+
+QUERIES = ["너만의 독특한 습관 있어?", "주말엔 뭐 해?", "스트레스 받으면 어떻게 풀어?"]
+
+
+async def _request(port, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"POST /chat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("utf-8") + body
+    )
+    await writer.drain()
+    await reader.read()  # 서버가 스트림을 끝내고 연결을 닫을 때까지
+    writer.close()
+
+
+def _build_store(store_root, mbti, embeddings):
+    from langchain.vectorstores import Chroma
+
+    db = Chroma(persist_directory=os.path.join(store_root, mbti), embedding_function=embeddings)
+    sync_documents(
+        db, load_qa_documents(TXT_PATHS[mbti]),
+        os.path.join(store_root, mbti, MANIFEST_NAME), file_hash(TXT_PATHS[mbti]),
+    )
+    return db
+
+
+async def run(total, concurrency, llm_latency, max_concurrent):
+    embeddings = FakeEmbeddings()
+    store_root = tempfile.mkdtemp(prefix="mbti-load-")
+    pool = BotPool(
+        lambda mbti: MBTIChatBot(
+            mbti, embeddings=embeddings, llm=FakeChatModel(latency=llm_latency),
+            db=_build_store(store_root, mbti, embeddings),
+            manifest_path=os.path.join(store_root, mbti, MANIFEST_NAME),
+        ),
+        initialize=False,
+    )
+    server = await ChatServer(pool, max_concurrent).start(port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    latencies = []
+    limiter = asyncio.Semaphore(concurrency)
+    sessions = []
+
+    async def one(i):
+        payload = {
+            "mbti": random.choice(list(MBTI_FEATURES)),
+            "query": random.choice(QUERIES),
+            "session_id": f"load-{i}",
+        }
+        sessions.append((payload["mbti"], payload["session_id"]))
+        async with limiter:
+            start = time.perf_counter()
+            await _request(port, payload)
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.close()
+        await server.wait_closed()
+        # 측정용 세션 기록과 임시 스토어는 남기지 않음
+        for mbti, session_id in sessions:
+            path = pool.get(mbti)._history_path(session_id)
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(store_root, ignore_errors=True)
+
+    latencies.sort()
+    print(json.dumps({
+        "requests": total,
+        "concurrency": concurrency,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "rps": total / elapsed,
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 챗봇 서버 부하 테스트")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--max-concurrent", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.llm_latency, args.max_concurrent))
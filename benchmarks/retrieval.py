@@ -0,0 +1,61 @@
+"""
+NumPy 인메모리 MMR vs Chroma MMR 마이크로벤치마크.
+각 유형의 저장된 임베딩을 쿼리로 써서 (네트워크 없이)
+쿼리당 검색 시간(µs)을 재고, 두 경로의 top-k가 같은지 확인한다.
+
+실행: python -m benchmarks.retrieval
+"""
+import statistics
+import time
+
+from langchain.vectorstores import Chroma
+
+from config import EMBEDDING_DB_PATH, TXT_PATHS
+from ingest import has_store_files, store_dir
+from numpy_retriever import NumpyIndex
+
+SEARCH_KWARGS = {"k": 3, "fetch_k": 10, "lambda_mult": 0.6}
+
+
+def _time_us(fn, queries, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    print(f"{'mbti':<6}{'chroma µs':>12}{'numpy µs':>12}{'speedup':>10}{'same top-k':>12}")
+    for mbti in TXT_PATHS:
+        path = store_dir(f"{EMBEDDING_DB_PATH}{mbti}_chroma_db")
+        if not has_store_files(path):
+            # 열기만 해도 빈 sqlite가 생기므로 아예 열지 않음
+            print(f"{mbti:<6}{'(스토어 없음, 건너뜀)':>12}")
+            continue
+        db = Chroma(persist_directory=path)
+        index = NumpyIndex.from_chroma(db)
+        if len(index) == 0:
+            print(f"{mbti:<6}{'(빈 스토어, 건너뜀)':>12}")
+            continue
+        queries = list(index.matrix)
+
+        def chroma_search(query):
+            return db.max_marginal_relevance_search_by_vector(query.tolist(), **SEARCH_KWARGS)
+
+        def numpy_search(query):
+            return index.max_marginal_relevance_search_by_vector(query, **SEARCH_KWARGS)
+
+        same = all(
+            [d.page_content for d in chroma_search(q)] == [d.page_content for d in numpy_search(q)]
+            for q in queries
+        )
+        chroma_us = _time_us(chroma_search, queries)
+        numpy_us = _time_us(numpy_search, queries)
+        print(f"{mbti:<6}{chroma_us:>12.1f}{numpy_us:>12.1f}{chroma_us / numpy_us:>9.1f}x{str(same):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+single-flight 동시성 체크.
+같은 질문을 동시에 N개 보냈을 때 실제 LLM/임베딩 호출 수가 N과 무관하게
+1번으로 유지되는지 확인한다. 가짜 LLM/임베딩과 임시 디렉터리의 스토어를 써서
+네트워크 없이 돌고, data/는 건드리지 않는다.
+LLM이나 임베딩 호출이 한 번이 아니면 종료 코드 1.
+
+실행: python -m benchmarks.single_flight
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from chatbot import MBTIChatBot
+from config import TXT_PATHS
+from fakes import FakeChatModel, FakeEmbeddings
+from ingest import MANIFEST_NAME, file_hash, load_qa_documents, sync_documents
+
+CALLS = {"llm": 0, "embed": 0}
+
+
+class CountingChatModel(FakeChatModel):
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        CALLS["llm"] += 1
+        async for chunk in super()._astream(messages, stop, run_manager, **kwargs):
+            yield chunk
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        CALLS["llm"] += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+class CountingEmbeddings(FakeEmbeddings):
+    # 비동기 aembed_*는 기본 구현이 이 두 메서드를 executor에서 부르므로 여기서만 셈
+    def embed_documents(self, texts):
+        CALLS["embed"] += 1
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        CALLS["embed"] += 1
+        return super().embed_query(text)
+
+
+async def _burst(bot, query, duplicates, streaming):
+    async def one(i):
+        if streaming:
+            # 대화 기록이 있는 세션은 합류 대상이 아니므로 버스트마다 새 세션을 씀
+            session_id = f"sf-{streaming}-{duplicates}-{i}"
+            return "".join([t async for t in bot.astream_response(query, session_id=session_id)])
+        return await bot.aget_response(query, use_history=False)
+
+    return await asyncio.gather(*(one(i) for i in range(duplicates)))
+
+
+def _build_store(store_root, mbti, embeddings):
+    from langchain.vectorstores import Chroma
+
+    db = Chroma(persist_directory=os.path.join(store_root, mbti), embedding_function=embeddings)
+    sync_documents(
+        db, load_qa_documents(TXT_PATHS[mbti]),
+        os.path.join(store_root, mbti, MANIFEST_NAME), file_hash(TXT_PATHS[mbti]),
+    )
+    return db
+
+
+async def _check(store_root):
+    # 스토어를 채울 때의 임베딩 호출은 버스트마다 카운터를 초기화하므로 섞이지 않음
+    embeddings = CountingEmbeddings()
+    bot = MBTIChatBot(
+        "infp", embeddings=embeddings, llm=CountingChatModel(latency=0.3),
+        db=_build_store(store_root, "infp", embeddings),
+        manifest_path=os.path.join(store_root, "infp", MANIFEST_NAME),
+    )
+    rows = []
+    failed = False
+    for streaming in (False, True):
+        for duplicates in (1, 10, 50, 200):
+            CALLS.update(llm=0, embed=0)
+            # 매번 다른 질문을 써서 임베딩 캐시의 영향을 빼고 합류 효과만 봄.
+            # 저장된 질문과 달라야 어휘 fast path를 타지 않고 임베딩 경로까지 확인됨
+            query = f"비 오는 주말에 혼자 집에서 하기 좋은 일 하나만 추천해줘 #{streaming}-{duplicates}"
+            answers = await _burst(bot, query, duplicates, streaming)
+            same = len(set(answers)) == 1
+            rows.append({"streaming": streaming, "duplicates": duplicates, **CALLS, "same_answer": same})
+            failed |= CALLS["llm"] != 1 or CALLS["embed"] != 1 or not same
+    for row in rows:
+        print(json.dumps(row))
+    # 스트리밍 확인에 쓴 세션 기록 파일은 지움
+    for memory in bot.memories.values():
+        if os.path.exists(memory.log_path):
+            os.remove(memory.log_path)
+    return failed
+
+
+async def main():
+    store_root = tempfile.mkdtemp(prefix="mbti-sf-")
+    try:
+        failed = await _check(store_root)
+    finally:
+        shutil.rmtree(store_root, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""
+콜드 스타트 벤치마크 + 회귀 체크.
+각 항목을 새 프로세스에서 재서, 기준값(초)을 넘으면 종료 코드 1로 끝낸다.
+
+- import_chatbot: `import chatbot` 시간
+- construct:      MBTIChatBot(...) 생성 + initialize_db() (스토어가 최신일 때)
+- main_ready:     main.py를 띄우고 첫 프롬프트를 거쳐 종료하기까지의 전체 시간
+- app_run:        streamlit 앱 스크립트 1회 실행 (streamlit이 설치돼 있을 때만)
+
+실제 스토어(data/embedding)는 건드리지 않는다. 임시 디렉터리에 txt를 복사하고
+가짜 임베딩으로 최신 상태의 스토어를 만들어 둔 뒤, 그 디렉터리를 작업 디렉터리로 삼아
+각 항목을 잰다. 그래서 API 키나 네트워크 없이 "스토어가 최신일 때"의 시작 시간만 나온다.
+
+실행: python -m benchmarks.startup [--repeat 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# main.py와 app.py가 기본으로 여는 유형
+MBTI = "infp"
+
+# 회귀 기준 (초). 무거운 import가 다시 상단으로 올라오면 여기서 걸림
+THRESHOLDS = {
+    "import_chatbot": 0.5,
+    "construct": 0.2,
+    "main_ready": 1.0,
+    "app_run": 3.0,
+}
+
+_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import chatbot
+print(time.perf_counter() - start)
+"""
+
+_CONSTRUCT_SNIPPET = """
+import time
+import chatbot
+start = time.perf_counter()
+bot = chatbot.MBTIChatBot("infp")
+bot.initialize_db()
+print(time.perf_counter() - start)
+"""
+
+_APP_SNIPPET = """
+import os
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+AppTest.from_file(os.path.join(os.environ["MBTI_ROOT"], "app.py"), default_timeout=30).run()
+print(time.perf_counter() - start)
+"""
+
+
+def _prepare_workdir():
+    # 임시 작업 디렉터리에 txt와 가짜 임베딩으로 만든 최신 스토어를 준비
+    from langchain.vectorstores import Chroma
+
+    from config import EMBEDDING_DB_PATH, TXT_PATHS, USE_SHARED_DB
+    from fakes import FakeEmbeddings
+    from ingest import MANIFEST_NAME, file_hash, load_qa_documents, sync_documents
+
+    if USE_SHARED_DB:
+        sys.exit("USE_SHARED_DB=True 구성은 지원하지 않음 (유형별 스토어 기준으로만 잼)")
+    workdir = tempfile.mkdtemp(prefix="mbti-startup-")
+    txt_path = os.path.join(workdir, TXT_PATHS[MBTI])
+    os.makedirs(os.path.dirname(txt_path), exist_ok=True)
+    shutil.copyfile(os.path.join(ROOT, TXT_PATHS[MBTI]), txt_path)
+    persist_directory = os.path.join(workdir, EMBEDDING_DB_PATH, f"{MBTI}_chroma_db")
+    db = Chroma(persist_directory=persist_directory, embedding_function=FakeEmbeddings())
+    sync_documents(
+        db, load_qa_documents(txt_path), os.path.join(persist_directory, MANIFEST_NAME), file_hash(txt_path),
+    )
+    return workdir
+
+
+def _run(args, workdir, **kwargs):
+    # 상대 경로(data/...)가 임시 디렉터리를 가리키도록 cwd를 바꾸고, import는 저장소에서 함
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+               MBTI_ROOT=ROOT)
+    return subprocess.run(args, cwd=workdir, env=env, capture_output=True, text=True, check=True, **kwargs)
+
+
+def _python(snippet, workdir):
+    out = _run([sys.executable, "-c", snippet], workdir)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _main_ready(workdir):
+    # 바로 exit를 입력해서 첫 프롬프트까지 뜨는 시간만 잰다
+    start = time.perf_counter()
+    _run([sys.executable, os.path.join(ROOT, "main.py")], workdir, input="exit\n")
+    return time.perf_counter() - start
+
+
+def _has_streamlit():
+    return subprocess.run([sys.executable, "-c", "import streamlit"], capture_output=True).returncode == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MBTI 챗봇 콜드 스타트 벤치마크")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        workdir = _prepare_workdir()
+    except ImportError as e:
+        sys.exit(f"임시 스토어를 만들 수 없음 ({e}). langchain/chromadb가 설치돼 있어야 함")
+
+    measures = {
+        "import_chatbot": lambda: _python(_IMPORT_SNIPPET, workdir),
+        "construct": lambda: _python(_CONSTRUCT_SNIPPET, workdir),
+        "main_ready": lambda: _main_ready(workdir),
+    }
+    if _has_streamlit():
+        measures["app_run"] = lambda: _python(_APP_SNIPPET, workdir)
+
+    results = {}
+    failed = []
+    try:
+        for name, measure in measures.items():
+            try:
+                value = statistics.median(measure() for _ in range(args.repeat))
+            except subprocess.CalledProcessError as e:
+                sys.exit(f"{name} 측정 실패:\n{e.stderr}")
+            results[name] = value
+            if value > THRESHOLDS[name]:
+                failed.append(name)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({"results": results, "thresholds": THRESHOLDS, "failed": failed}, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
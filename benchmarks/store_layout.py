@@ -0,0 +1,82 @@
+"""
+유형별 16개 스토어 vs 통합 컬렉션 비교 벤치마크.
+- 메모리: 16개 유형을 모두 열고 한 번씩 검색한 뒤의 최대 RSS
+- 콜드 스위치: 아직 안 연 유형으로 바꿨을 때 첫 검색까지 걸리는 시간
+
+쿼리 벡터는 스토어에 저장된 임베딩을 그대로 써서 네트워크 없이 돈다.
+먼저 `python shared_store.py migrate`로 통합 스토어를 만들어 둬야 함.
+아직 만들어지지 않았거나 비어 있는 스토어는 건너뛴다 (새로 만들지 않음).
+
+실행: python -m benchmarks.store_layout
+"""
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _run(layout):
+    from langchain.vectorstores import Chroma
+    from config import EMBEDDING_DB_PATH, SHARED_COLLECTION_NAME, SHARED_DB_PATH, TXT_PATHS
+    from ingest import has_store_files, store_dir
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    switch_times = []
+    skipped = []
+    shared = None
+    if layout == "shared" and not has_store_files(store_dir(SHARED_DB_PATH)):
+        return {"layout": layout, "skipped": "통합 스토어 없음 (python shared_store.py migrate)"}
+    for mbti in TXT_PATHS:
+        start = time.perf_counter()
+        if layout == "per_type":
+            path = store_dir(f"{EMBEDDING_DB_PATH}{mbti}_chroma_db")
+            if not has_store_files(path):
+                skipped.append(mbti)
+                continue
+            db = Chroma(persist_directory=path)
+            search_filter = None
+        else:
+            if shared is None:
+                shared = Chroma(collection_name=SHARED_COLLECTION_NAME, persist_directory=store_dir(SHARED_DB_PATH))
+            db = shared
+            search_filter = {"mbti": mbti}
+        rows = db.get(where=search_filter, limit=1, include=["embeddings"])["embeddings"]
+        if rows is None or len(rows) == 0:
+            skipped.append(mbti)
+            continue
+        query = rows[0]
+        db.max_marginal_relevance_search_by_vector(
+            query, k=3, fetch_k=10, lambda_mult=0.6, filter=search_filter
+        )
+        switch_times.append(time.perf_counter() - start)
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if not switch_times:
+        return {"layout": layout, "skipped": "검색할 수 있는 스토어 없음", "empty_types": skipped}
+    return {
+        "layout": layout,
+        "rss_delta_kb": rss_after - rss_before,
+        "max_rss_kb": rss_after,
+        "cold_switch_ms_median": statistics.median(switch_times) * 1000,
+        "cold_switch_ms_max": max(switch_times) * 1000,
+        "empty_types": skipped,
+    }
+
+
+def main():
+    # 레이아웃마다 별도 프로세스에서 돌려야 메모리 측정이 섞이지 않음
+    for layout in ("per_type", "shared"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.store_layout", "--child", layout],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        print(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(_run(sys.argv[2])))
+    else:
+        main()
@@ -0,0 +1,235 @@
+"""
+네트워크/API 키 없이 돌아가는 결정적 벤치마크 모음.
+가짜 임베딩(FakeEmbeddings)과 가짜 LLM(FakeChatModel)을 MBTIChatBot에 주입하고,
+벡터 스토어도 임시 디렉터리에 따로 만들어서 data/embedding은 건드리지 않는다.
+
+  ingest     data/*.txt 전체 적재 시간 (처음 / 변경 없는 재실행)
+  retrieval  유형별 검색 지연 (코퍼스에 있는 질문 / 처음 보는 질문)
+  e2e        get_response 전체 지연, stream_response 첫 토큰까지 시간
+  memory     16개 챗봇을 모두 띄우고 한 번씩 검색한 뒤의 RSS 증가량
+
+결과는 JSON으로 저장되고, --compare로 다른 커밋의 결과와 비교할 수 있다.
+
+  python -m benchmarks.suite --output benchmarks/results/$(git rev-parse --short HEAD).json
+  python -m benchmarks.suite --compare benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import config
+from chatbot import MBTIChatBot
+from fakes import FakeChatModel, FakeEmbeddings
+from ingest import MANIFEST_NAME, file_hash, load_qa_documents, sync_documents
+
+QUERIES_PER_TYPE = 20
+
+
+def _open_store(store_root, mbti):
+    from langchain.vectorstores import Chroma
+
+    return Chroma(persist_directory=os.path.join(store_root, mbti), embedding_function=FakeEmbeddings())
+
+
+def _sync_all(store_root):
+    for mbti, txt_path in config.TXT_PATHS.items():
+        sync_documents(
+            _open_store(store_root, mbti), load_qa_documents(txt_path),
+            os.path.join(store_root, mbti, MANIFEST_NAME), file_hash(txt_path),
+        )
+
+
+def bench_ingest(store_root):
+    chunks = sum(len(load_qa_documents(path)) for path in config.TXT_PATHS.values())
+    start = time.perf_counter()
+    _sync_all(store_root)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _sync_all(store_root)
+    noop = time.perf_counter() - start
+    return {"chunks": chunks, "seconds": first, "chunks_per_sec": chunks / first, "noop_seconds": noop}
+
+
+def _bots(store_root, llm_latency=0.0, tokens_per_second=0.0):
+    embeddings = FakeEmbeddings()
+    return {
+        mbti: MBTIChatBot(
+            mbti, embeddings=embeddings, db=_open_store(store_root, mbti),
+            manifest_path=os.path.join(store_root, mbti, MANIFEST_NAME),
+            llm=FakeChatModel(latency=llm_latency, tokens_per_second=tokens_per_second),
+        )
+        for mbti in config.MBTI_FEATURES
+    }
+
+
+def _queries(mbti):
+    questions = [
+        doc.metadata["question"] for doc in load_qa_documents(config.TXT_PATHS[mbti])
+        if "question" in doc.metadata
+    ][:QUERIES_PER_TYPE]
+    # 코퍼스에 그대로 있는 질문 / 살짝 바꾼 처음 보는 질문
+    return questions, [f"솔직히 말해서, {q} 요즘은 어때?" for q in questions]
+
+
+def _median_us(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def bench_retrieval(store_root):
+    results = {}
+    for mbti, bot in _bots(store_root).items():
+        stock, novel = _queries(mbti)
+        bot._retrieve(stock[0])  # 인덱스/클라이언트 준비는 측정에서 뺌
+        results[mbti] = {
+            "stock_query_us": _median_us(bot._retrieve, stock),
+            "novel_query_us": _median_us(bot._retrieve, novel),
+        }
+    return results
+
+
+def bench_e2e(store_root, llm_latency, tokens_per_second, repeat):
+    bot = _bots(store_root, llm_latency, tokens_per_second)["infp"]
+    _, novel = _queries("infp")
+    totals, ttfts, stream_totals = [], [], []
+    try:
+        for i in range(repeat):
+            query = novel[i % len(novel)]
+            bot.get_response(query, session_id=f"bench-{i}")
+            totals.append(bot.last_timing["total"])
+            for _ in bot.stream_response(query, session_id=f"bench-stream-{i}"):
+                pass
+            ttfts.append(bot.last_timing["ttft"])
+            stream_totals.append(bot.last_timing["total"])
+    finally:
+        # 측정용 세션 기록은 남기지 않음
+        for memory in bot.memories.values():
+            if os.path.exists(memory.log_path):
+                os.remove(memory.log_path)
+    return {
+        "llm_latency": llm_latency,
+        "tokens_per_second": tokens_per_second,
+        "get_response_ms": statistics.median(totals) * 1000,
+        "stream_ttft_ms": statistics.median(ttfts) * 1000,
+        "stream_total_ms": statistics.median(stream_totals) * 1000,
+        # 가짜 LLM 자체가 쓰는 시간을 뺀 파이프라인 오버헤드
+        "overhead_ms": (statistics.median(ttfts) - llm_latency) * 1000,
+    }
+
+
+def _rss_kb():
+    # ru_maxrss는 최고치이고 fork/exec 때 부모 값을 물려받아서, 지금 RSS를 /proc에서 읽음
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_memory_child(store_root):
+    before = _rss_kb()
+    bots = _bots(store_root)
+    for mbti, bot in bots.items():
+        bot._retrieve(_queries(mbti)[1][0])
+    after = _rss_kb()
+    return {"bots": len(bots), "rss_delta_kb": after - before, "rss_kb": after}
+
+
+def bench_memory(store_root):
+    # 다른 측정과 섞이지 않도록 별도 프로세스에서 잼
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--memory-child", store_root],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(prefix, value, out):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+    return out
+
+
+def compare(base, current):
+    old = _flatten("", base["results"], {})
+    new = _flatten("", current["results"], {})
+    print(f"{'metric':<45}{'base':>14}{'current':>14}{'change':>10}")
+    for key in sorted(new):
+        if key not in old:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+        print(f"{key:<45}{old[key]:>14.2f}{new[key]:>14.2f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MBTI 챗봇 오프라인 벤치마크")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="가짜 LLM 첫 토큰 지연 (초)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="가짜 LLM 토큰 속도")
+    parser.add_argument("--repeat", type=int, default=10, help="e2e 반복 횟수")
+    parser.add_argument("--memory-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.memory_child:
+        print(json.dumps(bench_memory_child(args.memory_child)))
+        return
+
+    store_root = tempfile.mkdtemp(prefix="mbti-bench-")
+    try:
+        results = {"ingest": bench_ingest(store_root)}
+        results["retrieval"] = bench_retrieval(store_root)
+        results["e2e"] = bench_e2e(store_root, args.llm_latency, args.tokens_per_second, args.repeat)
+        results["memory"] = bench_memory(store_root)
+    finally:
+        shutil.rmtree(store_root, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "retriever_backend": config.RETRIEVER_BACKEND,
+            "hybrid_retrieval": config.USE_HYBRID_RETRIEVAL,
+            "shared_db": config.USE_SHARED_DB,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,27 @@
-from langchain.vectorstores import Chroma
-from langchain.embeddings.openai import OpenAIEmbeddings
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.chat_models import ChatOpenAI
-from utils import load_and_split_txt, format_docs
-from config import EMBEDDING_DB_PATH, MBTI_FEATURES, TXT_PATHS
-from langchain_core.output_parsers import StrOutputParser
+# 무거운 라이브러리(langchain, chroma, numpy 등)는 처음 검색/LLM 호출 때 import 함.
+# 덕분에 main.py나 streamlit 앱이 첫 화면까지 기다리는 시간이 짧아짐.
+from utils import count_tokens, format_docs, normalize_text
+from tracing import NULL_TRACE, start_trace
+from ingest import (
+    MANIFEST_NAME, file_hash, is_up_to_date, load_qa_documents, shared_manifest_path, store_dir, sync_documents,
+)
+from config import (
+    EMBEDDING_DB_PATH, HYBRID_RRF_K, LEXICAL_MATCH_THRESHOLD, MBTI_FEATURES, MEMORY_MAX_SESSIONS,
+    PROMPT_VERSION, RETRIEVER_BACKEND, TXT_PATHS, USE_EMBEDDING_CACHE, USE_HYBRID_RETRIEVAL,
+    USE_RESPONSE_CACHE, USE_SHARED_DB, USE_SINGLE_FLIGHT,
+)
 from dotenv import load_dotenv
+from collections import OrderedDict
+import hashlib
 import os
+import time
 
 
 # 환경 변수 로드
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-class MBTIChatBot:
-    def __init__(self, mbti, temperature=0):
-        self.mbti = mbti
-        self.feature = MBTI_FEATURES[mbti]
-        self.history_path = f"data/{mbti}/{mbti}_history.txt"  # 대화 기록 파일 경로
-        self.txt_path = TXT_PATHS[mbti]  # TXT 파일 경로를 가져옵니다.
-        self.embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-        self.db = Chroma(
-            persist_directory=f"{EMBEDDING_DB_PATH}{mbti}_chroma_db",
-            embedding_function=self.embeddings
-        )
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=temperature, openai_api_key=OPENAI_API_KEY)
-        self.chat_template = ChatPromptTemplate.from_template(
-            """
+CHAT_TEMPLATE = """
     [MBTI 정보]
     - MBTI 유형: {mbti}
     - 주요 특징: {feature}
@@ -34,7 +29,8 @@ class MBTIChatBot:
     [대화 예시]
     {context}
 
-
+    [이전 대화 기록]
+    {history}
 
     [현재 질문]
     Q: {query}
@@ -50,35 +46,559 @@ class MBTIChatBot:
 
     [답변]
     A:
-             """
-        )
+"""
+
+
+class _NoLimit:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class MBTIChatBot:
+    def __init__(self, mbti, temperature=0, embeddings=None, llm=None, db=None, manifest_path=None):
+        self.mbti = mbti
+        self.temperature = temperature
+        self.feature = MBTI_FEATURES[mbti]
+        self.history_path = f"data/{mbti}/{mbti}_history.txt"  # 대화 기록 파일 경로 (기본 세션)
+        self.memories = OrderedDict()  # session_id -> ConversationMemory (오래 안 쓴 순서)
+        self.txt_path = TXT_PATHS[mbti]  # TXT 파일 경로를 가져옵니다.
+        # embeddings/llm/db를 넘기면 OpenAI, 기본 Chroma 스토어 대신 그걸 씀 (벤치마크, 부하 테스트용)
+        # 넘긴 embeddings는 임베딩 캐시로 감싸지 않고 그대로 씀.
+        # db를 넘길 때 manifest_path도 같이 넘기면 initialize_db가 그 스토어를 동기화함
+        self._embeddings = embeddings
+        self._db = db
+        self._injected_db = db is not None
+        self._injected_manifest_path = manifest_path
+        self._resolve_store()
+        self._numpy_index = None
+        self._llm = llm
+        self._chat_template = None
+        self._parser = None
+        self._llm_chain = None
+        self._flights = None
+        # 비동기 경로에서 LLM 호출만 감싸는 제한 (서버가 asyncio.Semaphore를 넣음).
+        # single-flight 합류나 캐시 히트는 LLM을 부르지 않으므로 자리를 차지하지 않음
+        self.llm_limiter = None
+        self.search_kwargs = {"k": 3, "fetch_k": 10, "lambda_mult": 0.6}
+        self.last_timing = None  # 마지막 턴의 {"ttft", "total"} (초)
+
+    def _resolve_store(self):
+        if self._injected_db:
+            # 주입된 스토어가 실제 스토어의 manifest를 읽거나 덮어쓰면 안 됨
+            self.manifest_path = self._injected_manifest_path
+            return
+        # chroma.py가 스토어를 교체했으면 포인터가 가리키는 새 버전 디렉터리를 씀
+        if USE_SHARED_DB:
+            # 모든 유형이 하나의 컬렉션을 공유하고, 검색 시 mbti로 필터링
+            self.manifest_path = shared_manifest_path(self.mbti)
+        else:
+            self.persist_directory = store_dir(f"{EMBEDDING_DB_PATH}{self.mbti}_chroma_db")
+            self.manifest_path = os.path.join(self.persist_directory, MANIFEST_NAME)
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from langchain.embeddings.openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+            if USE_EMBEDDING_CACHE:
+                from embedding_cache import CachedEmbeddings
+
+                # 반복되는 질문은 임베딩 API를 다시 부르지 않도록 캐시로 감쌈
+                embeddings = CachedEmbeddings(embeddings)
+            self._embeddings = embeddings
+        return self._embeddings
+
+    @property
+    def db(self):
+        if self._db is None:
+            if USE_SHARED_DB:
+                from shared_store import get_shared_db
+
+                self._db = get_shared_db(self.embeddings)
+            else:
+                from langchain.vectorstores import Chroma
+
+                self._db = Chroma(
+                    persist_directory=self.persist_directory,
+                    embedding_function=self.embeddings
+                )
+        return self._db
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from langchain_community.chat_models import ChatOpenAI
+
+            self._llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=self.temperature, openai_api_key=OPENAI_API_KEY)
+        return self._llm
+
+    @property
+    def chat_template(self):
+        if self._chat_template is None:
+            from langchain_core.prompts import ChatPromptTemplate
+
+            # 유형마다 바뀌지 않는 mbti/feature는 미리 채워 넣어서
+            # 매 턴에는 context/history/query만 렌더링하도록 함
+            feature = self.feature.replace("{", "{{").replace("}", "}}")
+            template = CHAT_TEMPLATE.replace("{mbti}", self.mbti).replace("{feature}", feature)
+            self._chat_template = ChatPromptTemplate.from_template(template)
+        return self._chat_template
+
+    @property
+    def llm_chain(self):
+        # 스트리밍용 llm | parser 파이프라인도 챗봇마다 한 번만 만듦
+        if self._llm_chain is None:
+            self._llm_chain = self.llm | self.parser
+        return self._llm_chain
 
     def initialize_db(self):
-        docs = load_and_split_txt(self.txt_path)  # TXT 파일을 로드하고 분할합니다.
-        self.db.add_documents(docs)
+        previous = self.manifest_path
+        self._resolve_store()
+        if self.manifest_path != previous and not self._injected_db:
+            from numpy_retriever import invalidate_numpy_index
+
+            # 떠 있는 동안 chroma.py로 스토어가 교체됨 -> 새 버전으로 다시 엶
+            self._db = None
+            invalidate_numpy_index(self.mbti)
+            self._numpy_index = None
+        if self.manifest_path is None:
+            # manifest 없이 주입된 스토어는 만든 쪽이 관리하므로 동기화하지 않음
+            return
+
+        # txt가 바뀌지 않았으면 임베딩 호출 없이 바로 종료
+        source_hash = file_hash(self.txt_path)
+        if is_up_to_date(self.manifest_path, source_hash):
+            return
+        from lexical import invalidate_lexical_index
+        from numpy_retriever import invalidate_numpy_index
 
-    def get_response(self, query):
-        retriever = self.db.as_retriever(
-            search_type="mmr",
-            search_kwargs={"k": 3, "fetch_k": 10, "lambda_mult": 0.6}
+        docs = load_qa_documents(self.txt_path)  # TXT 파일을 Q/A 한 줄씩 문서로 만듭니다.
+        # 새로 생기거나 바뀐 청크만 임베딩하고, 사라진 청크는 삭제
+        sync_documents(
+            self.db, docs, self.manifest_path, source_hash,
+            mbti=self.mbti if USE_SHARED_DB else None
         )
-        relevant_docs = retriever.get_relevant_documents(query)
-
-        unique_docs = []
-        seen_contents = set()
-
-        for doc in relevant_docs:
-            if doc.page_content not in seen_contents:
-                unique_docs.append(doc)
-                seen_contents.add(doc.page_content)
-         
-        
-        context = format_docs(unique_docs)
-        input_data = {
-            "mbti": self.mbti,
-            "feature": self.feature,
+        invalidate_numpy_index(self.mbti)
+        self._numpy_index = None
+        invalidate_lexical_index(self.mbti)
+
+    def warm(self):
+        # 전부 lazy라서, 서버 시작 때 불러두지 않으면 유형별 첫 요청이
+        # import + 스토어 열기 + LLM 클라이언트 생성 + 인덱스 빌드 비용을 다 냄
+        self.db
+        self.llm_chain
+        self.chat_template
+        if USE_HYBRID_RETRIEVAL:
+            from lexical import get_lexical_index
+
+            get_lexical_index(self.mbti)
+        if RETRIEVER_BACKEND == "numpy":
+            self._get_numpy_index()
+
+    def _history_path(self, session_id):
+        if session_id is None:
+            return self.history_path
+        # 문자를 걸러내면 "a.b"와 "ab"처럼 다른 세션이 같은 파일을 쓰게 되므로 해시로 파일 이름을 만듦
+        digest = hashlib.sha256(str(session_id).encode("utf-8")).hexdigest()[:32]
+        return f"data/{self.mbti}/{self.mbti}_{digest}_history.txt"
+
+    def memory(self, session_id=None):
+        if session_id in self.memories:
+            self.memories.move_to_end(session_id)
+            return self.memories[session_id]
+        from memory import ConversationMemory
+
+        memory = ConversationMemory(self._history_path(session_id), self.embeddings)
+        self.memories[session_id] = memory
+        # 세션이 한도를 넘으면 오래 안 쓴 것부터 내림. 기록 파일은 남아 있어서 다시 오면 읽어 옴
+        while len(self.memories) > MEMORY_MAX_SESSIONS:
+            self.memories.popitem(last=False)
+        return memory
+
+    def _build_input(self, relevant_docs, query, history="", trace=NULL_TRACE):
+        with trace.span("dedup"):
+            unique_docs = []
+            seen_contents = set()
+
+            for doc in relevant_docs:
+                if doc.page_content not in seen_contents:
+                    unique_docs.append(doc)
+                    seen_contents.add(doc.page_content)
+
+        with trace.span("format_docs"):
+            context = format_docs(unique_docs)
+        trace.set(retrieved_docs=len(relevant_docs), unique_docs=len(unique_docs))
+        return {
             "context": context,
+            "history": history,
             "query": query,
         }
-        chain = self.chat_template | self.llm | StrOutputParser()
-        return chain.invoke(input_data)
+
+    def _chroma_kwargs(self):
+        search_kwargs = dict(self.search_kwargs)
+        if USE_SHARED_DB:
+            search_kwargs["filter"] = {"mbti": self.mbti}
+        return search_kwargs
+
+    def _get_numpy_index(self):
+        from numpy_retriever import NumpyIndex, get_numpy_index
+
+        if self._injected_db:
+            # 주입된 스토어는 공용 인덱스 캐시 대신 챗봇이 직접 들고 있음
+            if self._numpy_index is None:
+                self._numpy_index = NumpyIndex.from_chroma(self.db)
+            return self._numpy_index
+        return get_numpy_index(self.mbti)
+
+    def _numpy_search(self, query_embedding):
+        index = self._get_numpy_index()
+        return index.max_marginal_relevance_search_by_vector(
+            query_embedding, mbti=self.mbti if USE_SHARED_DB else None, **self.search_kwargs
+        )
+
+    def _lexical_fast_path(self, query):
+        # 저장된 질문과 거의 같은 질문이면 임베딩 호출 없이 어휘 인덱스만으로 검색
+        from lexical import get_lexical_index
+
+        index = get_lexical_index(self.mbti)
+        matched = index.match_question(query, LEXICAL_MATCH_THRESHOLD)
+        if matched is None:
+            return None
+        others = [doc for doc, _ in index.search(query, self.search_kwargs["k"] + 1) if doc is not matched]
+        return [matched] + others[:self.search_kwargs["k"] - 1]
+
+    def _fuse(self, query, vector_docs):
+        from lexical import get_lexical_index, reciprocal_rank_fusion
+
+        lexical_docs = [doc for doc, _ in get_lexical_index(self.mbti).search(query, self.search_kwargs["fetch_k"])]
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], self.search_kwargs["k"], HYBRID_RRF_K)
+
+    def _fast_path(self, query, trace=NULL_TRACE):
+        if not USE_HYBRID_RETRIEVAL:
+            return None
+        with trace.span("lexical_fast_path"):
+            fast = self._lexical_fast_path(query)
+        trace.set(lexical_fast_path=fast is not None)
+        return fast
+
+    def _vector_retrieve(self, query, trace=NULL_TRACE, query_embedding=None):
+        # 응답 캐시 조회에서 이미 만든 임베딩이 있으면 다시 임베딩하지 않음
+        if query_embedding is None:
+            with trace.span("embed_query"):
+                query_embedding = self.embeddings.embed_query(query)
+        with trace.span("retrieve"):
+            if RETRIEVER_BACKEND == "numpy":
+                docs = self._numpy_search(query_embedding)
+            else:
+                docs = self.db.max_marginal_relevance_search_by_vector(query_embedding, **self._chroma_kwargs())
+        if not USE_HYBRID_RETRIEVAL:
+            return docs
+        with trace.span("fuse"):
+            return self._fuse(query, docs)
+
+    async def _avector_retrieve(self, query, trace=NULL_TRACE, query_embedding=None):
+        if query_embedding is None:
+            with trace.span("embed_query"):
+                query_embedding = await self.embeddings.aembed_query(query)
+        with trace.span("retrieve"):
+            if RETRIEVER_BACKEND == "numpy":
+                docs = self._numpy_search(query_embedding)
+            else:
+                docs = await self.db.amax_marginal_relevance_search_by_vector(
+                    query_embedding, **self._chroma_kwargs()
+                )
+        if not USE_HYBRID_RETRIEVAL:
+            return docs
+        with trace.span("fuse"):
+            return self._fuse(query, docs)
+
+    def _retrieve(self, query, trace=NULL_TRACE, query_embedding=None):
+        fast = self._fast_path(query, trace)
+        if fast is not None:
+            return fast
+        return self._vector_retrieve(query, trace, query_embedding)
+
+    async def _aretrieve(self, query, trace=NULL_TRACE, query_embedding=None):
+        fast = self._fast_path(query, trace)
+        if fast is not None:
+            return fast
+        return await self._avector_retrieve(query, trace, query_embedding)
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            from langchain_core.output_parsers import StrOutputParser
+
+            self._parser = StrOutputParser()
+        return self._parser
+
+    def _trace_tokens(self, trace, prompt, response, message=None):
+        # 계측이 꺼져 있으면 토큰 세는 비용도 들이지 않음
+        if not trace.enabled:
+            return
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            trace.set(prompt_tokens=usage["input_tokens"], completion_tokens=usage["output_tokens"])
+        else:
+            # 스트리밍 등 사용량 정보가 없으면 직접 셈
+            trace.set(prompt_tokens=count_tokens(prompt.to_string()), completion_tokens=count_tokens(response))
+
+    def _generate(self, input_data, trace):
+        with trace.span("prompt"):
+            prompt = self.chat_template.invoke(input_data)
+        with trace.span("llm"):
+            message = self.llm.invoke(prompt)
+        with trace.span("parse"):
+            response = self.parser.invoke(message)
+        self._trace_tokens(trace, prompt, response, message)
+        return response
+
+    async def _agenerate(self, input_data, trace):
+        with trace.span("prompt"):
+            prompt = await self.chat_template.ainvoke(input_data)
+        with trace.span("llm"):
+            async with self.llm_limiter or _NoLimit():
+                message = await self.llm.ainvoke(prompt)
+        with trace.span("parse"):
+            response = await self.parser.ainvoke(message)
+        self._trace_tokens(trace, prompt, response, message)
+        return response
+
+    def _record_timing(self, start, first_token_at):
+        # 턴마다 첫 토큰까지 걸린 시간(ttft)과 전체 시간을 기록
+        end = time.perf_counter()
+        self.last_timing = {
+            "ttft": (first_token_at or end) - start,
+            "total": end - start,
+        }
+
+    def _cache_namespace(self):
+        # 모델/temperature/프롬프트가 바뀌면 예전 답변은 재사용하지 않음
+        model_name = getattr(self.llm, "model_name", type(self.llm).__name__)
+        return (self.mbti, model_name, self.temperature, PROMPT_VERSION)
+
+    def _lookup(self, query, has_history, trace=NULL_TRACE):
+        # 반환값: (fast path 문서, 캐시된 답변, 질문 임베딩)
+        # 어휘 fast path를 먼저 봐서, 저장된 질문이면 캐시 조회용 임베딩도 만들지 않음
+        fast = self._fast_path(query, trace)
+        if fast is not None:
+            trace.set(cache="skip")
+            return fast, None, None
+        cached, query_embedding = self._lookup_cached(query, has_history, trace)
+        return None, cached, query_embedding
+
+    async def _alookup(self, query, has_history, trace=NULL_TRACE, query_embedding=None):
+        fast = self._fast_path(query, trace)
+        if fast is not None:
+            trace.set(cache="skip")
+            return fast, None, None
+        cached, query_embedding = await self._alookup_cached(query, has_history, trace, query_embedding)
+        return None, cached, query_embedding
+
+    def _lookup_cached(self, query, has_history, trace=NULL_TRACE):
+        # 이전 대화가 있으면 답이 달라질 수 있으므로 캐시를 쓰지 않음
+        if not USE_RESPONSE_CACHE or has_history:
+            trace.set(cache="off")
+            return None, None
+        from response_cache import get_response_cache
+
+        with trace.span("cache_lookup"):
+            query_embedding = self.embeddings.embed_query(query)
+            cached = get_response_cache().lookup(self._cache_namespace(), query_embedding)
+        trace.set(cache="miss" if cached is None else "hit")
+        return cached, query_embedding
+
+    async def _alookup_cached(self, query, has_history, trace=NULL_TRACE, query_embedding=None):
+        # query_embedding: 배치 모드처럼 미리 만들어 둔 임베딩이 있으면 그대로 씀
+        if not USE_RESPONSE_CACHE or has_history:
+            trace.set(cache="off")
+            return None, None
+        from response_cache import get_response_cache
+
+        with trace.span("cache_lookup"):
+            if query_embedding is None:
+                query_embedding = await self.embeddings.aembed_query(query)
+            cached = get_response_cache().lookup(self._cache_namespace(), query_embedding)
+        trace.set(cache="miss" if cached is None else "hit")
+        return cached, query_embedding
+
+    def _store_cached(self, query_embedding, response):
+        if query_embedding is not None:
+            from response_cache import get_response_cache
+
+            get_response_cache().store(
+                self._cache_namespace(), query_embedding, response, self.last_timing["total"]
+            )
+
+    def get_response(self, query, session_id=None):
+        start = time.perf_counter()
+        trace = start_trace(self.mbti)
+        memory = self.memory(session_id)
+        fast, cached, query_embedding = self._lookup(query, len(memory) > 0, trace)
+        if cached is not None:
+            self._record_timing(start, None)
+            memory.add_turn(query, cached)
+            trace.finish()
+            return cached
+
+        relevant_docs = fast if fast is not None else self._vector_retrieve(query, trace, query_embedding)
+        with trace.span("history"):
+            history = memory.render(query)
+        input_data = self._build_input(relevant_docs, query, history, trace)
+        response = self._generate(input_data, trace)
+        self._record_timing(start, None)
+        self._store_cached(query_embedding, response)
+        memory.add_turn(query, response)
+        trace.finish()
+        return response
+
+    def _flight_key(self, query):
+        return (self.mbti, normalize_text(query))
+
+    def _single_flight(self):
+        if self._flights is None:
+            from singleflight import SingleFlight
+
+            self._flights = SingleFlight()
+        return self._flights
+
+    async def _aanswer(self, query, memory, prefetched=None):
+        # memory가 None이면 대화 기록 없이 답변 (같은 질문끼리 결과를 공유할 수 있음)
+        start = time.perf_counter()
+        trace = start_trace(self.mbti)
+        fast, cached, query_embedding = await self._alookup(query, bool(memory), trace, prefetched)
+        if cached is None:
+            # 캐시가 꺼져 있으면 query_embedding은 None이므로 미리 만든 임베딩으로 검색
+            query_vector = query_embedding if query_embedding is not None else prefetched
+            relevant_docs = fast if fast is not None else await self._avector_retrieve(query, trace, query_vector)
+            with trace.span("history"):
+                history = await memory.arender(query) if memory is not None else ""
+            input_data = self._build_input(relevant_docs, query, history, trace)
+            response = await self._agenerate(input_data, trace)
+            self._record_timing(start, None)
+            self._store_cached(query_embedding, response)
+        else:
+            response = cached
+            self._record_timing(start, None)
+        trace.finish()
+        return response
+
+    async def aget_response(self, query, session_id=None, use_history=True, query_embedding=None):
+        # use_history=False면 대화 기록을 읽지도 남기지도 않음 (배치 평가용)
+        # query_embedding을 넘기면 캐시 조회/검색에서 질문을 다시 임베딩하지 않음
+        memory = self.memory(session_id) if use_history else None
+        if memory or not USE_SINGLE_FLIGHT:
+            response = await self._aanswer(query, memory, query_embedding)
+        else:
+            # 대화 기록이 없는 같은 질문은 동시에 들어와도 검색/LLM을 한 번만 호출
+            response = await self._single_flight().do(
+                self._flight_key(query), lambda: self._aanswer(query, None, query_embedding)
+            )
+        if memory is not None:
+            await memory.aadd_turn(query, response)
+        return response
+
+    def stream_response(self, query, session_id=None):
+        # LLM이 생성하는 토큰을 바로바로 넘겨줌
+        start = time.perf_counter()
+        trace = start_trace(self.mbti)
+        memory = self.memory(session_id)
+        fast, cached, query_embedding = self._lookup(query, len(memory) > 0, trace)
+        if cached is not None:
+            self._record_timing(start, None)
+            memory.add_turn(query, cached)
+            trace.finish()
+            yield cached
+            return
+
+        first_token_at = None
+        tokens = []
+        relevant_docs = fast if fast is not None else self._vector_retrieve(query, trace, query_embedding)
+        with trace.span("history"):
+            history = memory.render(query)
+        input_data = self._build_input(relevant_docs, query, history, trace)
+        with trace.span("prompt"):
+            prompt = self.chat_template.invoke(input_data)
+        try:
+            # 스트리밍에서는 LLM 호출과 파싱이 토큰 단위로 섞여 있어서 "llm" 하나로 잼.
+            # 받는 쪽이 토큰을 처리하는 시간은 빼고 다음 토큰을 기다리는 시간만 더함
+            stream = iter(self.llm_chain.stream(prompt))
+            while True:
+                with trace.span("llm"):
+                    try:
+                        token = next(stream)
+                    except StopIteration:
+                        break
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens.append(token)
+                yield token
+        finally:
+            self._record_timing(start, first_token_at)
+        response = "".join(tokens)
+        self._store_cached(query_embedding, response)
+        memory.add_turn(query, response)
+        self._trace_tokens(trace, prompt, response)
+        trace.set(ttft=self.last_timing["ttft"])
+        trace.finish()
+
+    async def _astream(self, query, memory):
+        start = time.perf_counter()
+        trace = start_trace(self.mbti)
+        fast, cached, query_embedding = await self._alookup(query, bool(memory), trace)
+        if cached is not None:
+            self._record_timing(start, None)
+            trace.finish()
+            yield cached
+            return
+
+        first_token_at = None
+        tokens = []
+        relevant_docs = fast if fast is not None else await self._avector_retrieve(query, trace, query_embedding)
+        with trace.span("history"):
+            history = await memory.arender(query) if memory is not None else ""
+        input_data = self._build_input(relevant_docs, query, history, trace)
+        with trace.span("prompt"):
+            prompt = await self.chat_template.ainvoke(input_data)
+        try:
+            # stream_response와 같이 토큰을 기다리는 시간만 "llm"으로 잼
+            async with self.llm_limiter or _NoLimit():
+                stream = self.llm_chain.astream(prompt)
+                while True:
+                    with trace.span("llm"):
+                        try:
+                            token = await stream.__anext__()
+                        except StopAsyncIteration:
+                            break
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    tokens.append(token)
+                    yield token
+        finally:
+            self._record_timing(start, first_token_at)
+        response = "".join(tokens)
+        self._store_cached(query_embedding, response)
+        self._trace_tokens(trace, prompt, response)
+        trace.set(ttft=self.last_timing["ttft"])
+        trace.finish()
+
+    async def astream_response(self, query, session_id=None, use_history=True):
+        # use_history=False면 대화 기록을 읽지도 남기지도 않음 (세션 없는 서버 요청)
+        memory = self.memory(session_id) if use_history else None
+        if memory or not USE_SINGLE_FLIGHT:
+            stream = self._astream(query, memory)
+        else:
+            # 같은 질문이 동시에 오면 LLM 스트림 하나를 여러 호출자가 나눠 받음
+            stream = self._single_flight().stream(
+                self._flight_key(query), lambda: self._astream(query, None)
+            )
+        tokens = []
+        async for token in stream:
+            tokens.append(token)
+            yield token
+        if memory is not None:
+            await memory.aadd_turn(query, "".join(tokens))
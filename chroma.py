@@ -1,42 +1,253 @@
+"""
+여러 유형의 벡터 스토어를 한 번에 만들거나 다시 만드는 적재 명령.
+
+1. 대상 유형의 txt를 모두 읽어 청크로 나눔
+2. 기존 스토어에 같은 텍스트의 임베딩이 있으면 그대로 재사용 (--rebuild면 전부 새로)
+3. 남은 청크는 유형 구분 없이 큰 배치로 묶어서 워커 풀에서 병렬 임베딩
+4. 유형별로 새 버전 디렉터리(.<스토어 이름>.<버전>)에 한 번에 써 넣은 뒤
+   "<스토어 경로>.current" 포인터 파일을 os.replace로 바꿔서 교체
+   -> 교체는 원자적이고, 서버는 반쯤 만들어진 스토어나 빈 경로를 절대 보지 않음
+
+이미 떠 있는 서버는 교체 뒤에도 이전 버전을 계속 읽는다 (chromadb가 경로별로 클라이언트를 캐시함).
+재시작하거나 챗봇의 initialize_db()를 다시 부르면 새 버전으로 다시 연다.
+이전 버전은 실행 중인 프로세스가 아직 열고 있을 수 있어서 자동으로 지우지 않고,
+모든 서버를 재시작한 뒤 --prune으로 지운다.
+
+  python chroma.py                      # 전체 유형, 바뀐 것만
+  python chroma.py --mbti estp infp     # 일부 유형만
+  python chroma.py --rebuild --workers 8 --batch-size 512
+  python chroma.py --prune              # 지금 안 쓰는 이전 버전 삭제
+"""
+import argparse
 import os
-from langchain.vectorstores import Chroma
-from langchain.embeddings.openai import OpenAIEmbeddings
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 from dotenv import load_dotenv
 
+from config import EMBEDDING_DB_PATH, SHARED_COLLECTION_NAME, SHARED_DB_PATH, TXT_PATHS, USE_SHARED_DB
+from ingest import (
+    CHUNKING_VERSION, MANIFEST_NAME, POINTER_SUFFIX, chunk_id, file_hash, is_up_to_date, load_manifest,
+    load_qa_documents, save_manifest, shared_manifest_path, store_dir,
+)
+
+UPSERT_BATCH_SIZE = 5000
+
+
+def _store_dir(mbti):
+    return SHARED_DB_PATH if USE_SHARED_DB else f"{EMBEDDING_DB_PATH}{mbti}_chroma_db"
+
+
+def _manifest_path(mbti, store_dir):
+    if USE_SHARED_DB:
+        return os.path.join(store_dir, os.path.basename(shared_manifest_path(mbti)))
+    return os.path.join(store_dir, MANIFEST_NAME)
+
+
+def _open_collection(path):
+    from langchain.vectorstores import Chroma
+
+    if USE_SHARED_DB:
+        return Chroma(collection_name=SHARED_COLLECTION_NAME, persist_directory=path)
+    return Chroma(persist_directory=path)
+
+
+def _existing_rows(mbti):
+    # 지금 스토어에 있는 행들을 텍스트 해시 기준으로 모음 (임베딩 재사용용)
+    path = store_dir(_store_dir(mbti))
+    if not os.path.isdir(path):
+        return {}
+    where = {"mbti": mbti} if USE_SHARED_DB else None
+    rows = _open_collection(path).get(where=where, include=["documents", "embeddings"])
+    return {chunk_id(text): emb for text, emb in zip(rows["documents"], rows["embeddings"])}
+
 
-from langchain.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+class Progress:
+    def __init__(self, total, label):
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.start = time.perf_counter()
 
-mbti = 'estp'
+    def update(self, n):
+        self.done += n
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        print(f"\r{self.label}: {self.done}/{self.total} 청크 ({rate:.1f} chunks/s)", end="", flush=True)
+        if self.done >= self.total:
+            print()
 
-def load_and_split_txt(txt_path, chunk_size=100, chunk_overlap=0):
-    # TXT 파일 로드
-    loader = TextLoader(txt_path, encoding="utf-8")
-    data = loader.load()
 
-    # 텍스트 분할기 초기화
-    text_splitter = RecursiveCharacterTextSplitter(
-        separators = '\n',
-        chunk_size = chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len
+def _embed_all(embeddings, texts, batch_size, workers):
+    # 모든 유형의 청크를 한데 모아서 큰 배치로 병렬 임베딩
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    progress = Progress(len(texts), "임베딩")
+    vectors = {}
+
+    def embed(batch):
+        result = embeddings.embed_documents(batch)
+        return batch, result
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch, result in pool.map(embed, batches):
+            vectors.update(zip(batch, result))
+            progress.update(len(batch))
+    return vectors
+
+
+def _version_prefix(final_dir):
+    return f".{os.path.basename(final_dir)}."
+
+
+def _write_store(final_dir, rows_by_type, manifests):
+    # 새 버전 디렉터리에 모두 쓴 다음 포인터 파일만 원자적으로 바꿔서 교체
+    parent = os.path.dirname(final_dir)
+    version = f"{_version_prefix(final_dir)}{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    version_dir = os.path.join(parent, version)
+    collection = _open_collection(version_dir)._collection
+    for mbti, rows in rows_by_type.items():
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[i:i + UPSERT_BATCH_SIZE]
+            collection.upsert(
+                ids=[r["id"] for r in batch],
+                documents=[r["text"] for r in batch],
+                metadatas=[r["metadata"] for r in batch],
+                embeddings=[r["embedding"] for r in batch],
+            )
+    for mbti, manifest in manifests.items():
+        save_manifest(_manifest_path(mbti, version_dir), manifest)
+
+    # 이전 버전 디렉터리는 그대로 둠 (실행 중인 서버가 아직 열고 있을 수 있음)
+    pointer = final_dir + POINTER_SUFFIX
+    tmp_pointer = f"{pointer}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_pointer, pointer)
+
+
+def stale_versions(final_dir):
+    # 포인터가 가리키지 않는 이전 버전 디렉터리들 (포인터 전의 원래 디렉터리 포함)
+    current = store_dir(final_dir)
+    if current == final_dir:
+        return []
+    parent = os.path.dirname(final_dir) or "."
+    stale = [
+        os.path.join(os.path.dirname(final_dir), name) for name in sorted(os.listdir(parent))
+        if name.startswith(_version_prefix(final_dir))
+    ]
+    if os.path.isdir(final_dir):
+        stale.append(final_dir)
+    return [path for path in stale if path != current and os.path.isdir(path)]
+
+
+def prune(mbti_list):
+    # 모든 서버가 새 버전으로 다시 연 뒤에만 실행할 것
+    final_dirs = [SHARED_DB_PATH] if USE_SHARED_DB else [_store_dir(mbti) for mbti in mbti_list]
+    for final_dir in final_dirs:
+        for path in stale_versions(final_dir):
+            shutil.rmtree(path)
+            print(f"삭제: {path}")
+
+
+def _keep_existing_shared(mbti):
+    # 통합 스토어에서 이번에 다시 만들지 않는 유형은 기존 행을 그대로 옮김
+    rows = _open_collection(store_dir(SHARED_DB_PATH)).get(
+        where={"mbti": mbti}, include=["documents", "metadatas", "embeddings"]
     )
-    
-    # 텍스트 분할 후 반환
-    return text_splitter.split_documents(data)
+    return [
+        {"id": row_id, "text": text, "metadata": meta or {"mbti": mbti}, "embedding": emb}
+        for row_id, text, meta, emb in zip(rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"])
+    ]
+
+
+def ingest(mbti_list, embeddings, rebuild=False, workers=4, batch_size=256):
+    targets = []
+    for mbti in mbti_list:
+        source_hash = file_hash(TXT_PATHS[mbti])
+        if not rebuild and is_up_to_date(_manifest_path(mbti, store_dir(_store_dir(mbti))), source_hash):
+            print(f"{mbti}: 변경 없음, 건너뜀")
+            continue
+        targets.append((mbti, source_hash))
+    if not targets:
+        return
 
+    # 1~2. 청크 준비 + 기존 임베딩 재사용
+    chunks = {}
+    for mbti, _ in targets:
+        existing = {} if rebuild else _existing_rows(mbti)
+        rows = {}
+        for doc in load_qa_documents(TXT_PATHS[mbti]):
+            text = doc.page_content
+            row_id = chunk_id(text, mbti if USE_SHARED_DB else None)
+            metadata = dict(doc.metadata)
+            if USE_SHARED_DB:
+                metadata["mbti"] = mbti
+            rows.setdefault(row_id, {
+                "id": row_id, "text": text, "metadata": metadata,
+                "embedding": existing.get(chunk_id(text)),
+            })
+        chunks[mbti] = list(rows.values())
 
-texts = load_and_split_txt(f'data/{mbti}.txt')
+    # 3. 임베딩이 없는 청크만 유형 구분 없이 모아서 처리
+    missing = list(dict.fromkeys(
+        r["text"] for rows in chunks.values() for r in rows if r["embedding"] is None
+    ))
+    total = sum(len(rows) for rows in chunks.values())
+    print(f"{len(targets)}개 유형, {total}개 청크 중 {len(missing)}개 임베딩 필요")
+    start = time.perf_counter()
+    vectors = _embed_all(embeddings, missing, batch_size, workers) if missing else {}
+    for rows in chunks.values():
+        for r in rows:
+            if r["embedding"] is None:
+                r["embedding"] = vectors[r["text"]]
 
+    # 4. 저장 + 교체
+    manifests = {
+        mbti: {
+            "source_hash": source_hash, "chunking": CHUNKING_VERSION,
+            "ids": [r["id"] for r in chunks[mbti]],
+        }
+        for mbti, source_hash in targets
+    }
+    if USE_SHARED_DB:
+        rows_by_type = dict(chunks)
+        for mbti in TXT_PATHS:
+            if mbti not in rows_by_type and os.path.isdir(store_dir(SHARED_DB_PATH)):
+                rows_by_type[mbti] = _keep_existing_shared(mbti)
+                manifest = load_manifest(shared_manifest_path(mbti))
+                if manifest is not None:
+                    manifests[mbti] = manifest
+        _write_store(SHARED_DB_PATH, rows_by_type, manifests)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(
+                lambda mbti: _write_store(_store_dir(mbti), {mbti: chunks[mbti]}, {mbti: manifests[mbti]}),
+                chunks,
+            ))
 
-# .env 파일 로드
-load_dotenv()
+    elapsed = time.perf_counter() - start
+    print(f"완료: {total}개 청크, {elapsed:.1f}s ({total / elapsed if elapsed else 0:.1f} chunks/s)")
+    print("실행 중인 서버는 재시작해야 새 스토어를 읽음. 재시작한 뒤 --prune으로 이전 버전을 지울 수 있음")
 
-# OpenAI API 키 가져오기
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-# OpenAI 임베딩 초기화
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 벡터 스토어 일괄 적재")
+    parser.add_argument("--mbti", nargs="*", help="대상 유형 (기본: 전체)")
+    parser.add_argument("--rebuild", action="store_true", help="기존 임베딩을 무시하고 새로 만듦")
+    parser.add_argument("--workers", type=int, default=4, help="병렬 워커 수")
+    parser.add_argument("--batch-size", type=int, default=256, help="임베딩 API 한 번에 보낼 청크 수")
+    parser.add_argument("--prune", action="store_true", help="지금 안 쓰는 이전 버전 스토어 삭제 (서버 재시작 후)")
+    args = parser.parse_args()
 
-db = Chroma.from_documents(texts, embeddings, persist_directory= f"./data/embedding/{mbti}_chroma_db")
+    if args.prune:
+        prune(args.mbti or list(TXT_PATHS))
+    else:
+        from langchain.embeddings.openai import OpenAIEmbeddings
+        from embedding_cache import CachedEmbeddings
 
+        # .env 파일 로드
+        load_dotenv()
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")))
+        ingest(args.mbti or list(TXT_PATHS), embeddings, args.rebuild, args.workers, args.batch_size)
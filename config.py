@@ -144,4 +144,48 @@ TXT_PATHS = {
     # 추가 MBTI TXT 경로들...
 }
 
-EMBEDDING_DB_PATH = "data/embedding/"
\ No newline at end of file
+EMBEDDING_DB_PATH = "data/embedding/"
+
+# True면 16개 유형을 mbti metadata로 구분하는 하나의 통합 컬렉션을 사용
+USE_SHARED_DB = False
+SHARED_DB_PATH = "data/embedding/shared_chroma_db"
+SHARED_COLLECTION_NAME = "mbti"
+
+# 검색 백엔드: "chroma" 또는 "numpy" (임베딩을 메모리에 올려 NumPy로 MMR 계산)
+RETRIEVER_BACKEND = "chroma"
+
+# 쿼리/문서 임베딩 캐시 (메모리 LRU + 디스크 sqlite)
+USE_EMBEDDING_CACHE = True
+EMBEDDING_CACHE_PATH = "data/embedding/embedding_cache.sqlite3"
+EMBEDDING_CACHE_MEMORY_SIZE = 2048  # 메모리에 둘 벡터 개수
+EMBEDDING_CACHE_DISK_SIZE = 100000  # 디스크에 둘 벡터 개수
+
+# 프롬프트 템플릿을 고치면 올려서 응답 캐시를 무효화
+PROMPT_VERSION = "v2"
+
+# 의미 기반 응답 캐시 (비슷한 질문이면 LLM 호출 없이 이전 답변 재사용)
+USE_RESPONSE_CACHE = False
+RESPONSE_CACHE_THRESHOLD = 0.95  # 질문 임베딩 코사인 유사도 하한
+RESPONSE_CACHE_TTL = 60 * 60 * 24  # 초
+RESPONSE_CACHE_MAX_ENTRIES = 1000
+
+# 서버에서 동시에 진행할 수 있는 LLM 호출 수
+MAX_CONCURRENT_LLM_CALLS = 32
+
+# 대화 기록: 최근 턴은 토큰 예산 안에서, 오래된 턴은 질문과 비슷한 것만 골라서 프롬프트에 넣음
+MEMORY_TOKEN_BUDGET = 800
+MEMORY_RECALL_TOKEN_BUDGET = 300
+MEMORY_RECALL_K = 3
+MEMORY_MAX_SESSIONS = 1000  # 챗봇마다 메모리에 올려둘 세션 수 (넘으면 오래 안 쓴 것부터 내림)
+
+# 하이브리드 검색: 글자 n-gram BM25와 벡터 검색 결과를 RRF로 합침
+USE_HYBRID_RETRIEVAL = True
+HYBRID_RRF_K = 60
+# 저장된 질문과 이 정도 이상 비슷하면(글자 n-gram Dice) 임베딩 없이 어휘 인덱스로만 검색
+LEXICAL_MATCH_THRESHOLD = 0.85
+
+# 단계별 지연/토큰 계측: None(끔), "log", "prometheus"
+TRACE_SINK = None
+
+# 대화 기록 없는 같은 질문이 동시에 들어오면 검색/LLM 호출을 하나로 합침
+USE_SINGLE_FLIGHT = True
@@ -0,0 +1,168 @@
+"""
+임베딩 캐시. (모델, 정규화된 텍스트)를 키로
+1) 프로세스 안의 LRU 메모리 캐시, 2) 디스크(sqlite) 캐시 순서로 찾아보고
+둘 다 없을 때만 실제 임베딩 API를 호출한다.
+같은 질문이 반복되는 트래픽에서 지연과 비용을 줄이기 위한 것.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_CACHE_DISK_SIZE, EMBEDDING_CACHE_MEMORY_SIZE, EMBEDDING_CACHE_PATH
+from utils import normalize_text
+
+
+class EmbeddingCacheStore:
+    def __init__(self, path=EMBEDDING_CACHE_PATH, memory_size=EMBEDDING_CACHE_MEMORY_SIZE,
+                 disk_size=EMBEDDING_CACHE_DISK_SIZE):
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self.conn.commit()
+        # 행 수는 시작할 때 한 번만 세고 이후에는 직접 더하고 뺌 (put_many마다 COUNT(*) 안 하려고)
+        self.count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model, text):
+        raw = f"{model}\n{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        # 찾은 것만 {key: vector}로 반환
+        found = {}
+        with self.lock:
+            disk_keys = []
+            for key in keys:
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    found[key] = self.memory[key]
+                    self.stats["memory_hits"] += 1
+                else:
+                    disk_keys.append(key)
+
+            if disk_keys:
+                placeholders = ",".join("?" * len(disk_keys))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", disk_keys
+                ).fetchall()
+                if rows:
+                    self.conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(time.time(), key) for key, _ in rows],
+                    )
+                    self.conn.commit()
+                for key, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                self.stats["disk_hits"] += len(rows)
+                self.stats["misses"] += len(disk_keys) - len(rows)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self.lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            # 새로 들어간 행 수를 알아야 해서 REPLACE 대신 IGNORE 후 UPDATE
+            inserted = self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            ).rowcount
+            if inserted < len(rows):
+                self.conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_used = ? WHERE key = ?",
+                    [(blob, used, key) for key, blob, used in rows],
+                )
+            self.count += inserted
+            # 디스크 캐시가 한도를 넘으면 가장 오래 안 쓴 것부터 삭제
+            if self.count > self.disk_size:
+                self.count -= self.conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self.count - self.disk_size,),
+                ).rowcount
+            self.conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """Chroma 등에 그대로 넘길 수 있는 캐시 래퍼."""
+
+    def __init__(self, base, store=None, model=None):
+        self.base = base
+        self.store = store or get_embedding_cache()
+        self.model = model or getattr(base, "model", None) or type(base).__name__
+
+    def _lookup(self, texts):
+        keys = [self.store.make_key(self.model, text) for text in texts]
+        found = self.store.get_many(set(keys))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        return keys, found, missing
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._lookup(texts)
+        if missing:
+            vectors = self.base.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing, vectors))
+            self.store.put_many(new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        # sqlite 조회/쓰기는 블로킹이라 이벤트 루프를 막지 않게 스레드에서 실행
+        loop = asyncio.get_running_loop()
+        keys, found, missing = await loop.run_in_executor(None, self._lookup, texts)
+        if missing:
+            vectors = await self.base.aembed_documents(list(missing.values()))
+            new_items = dict(zip(missing, vectors))
+            await loop.run_in_executor(None, self.store.put_many, new_items)
+            found.update(new_items)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+# 모든 챗봇이 같은 캐시를 공유
+_store = None
+
+
+def get_embedding_cache():
+    global _store
+    if _store is None:
+        _store = EmbeddingCacheStore()
+    return _store
+
+
+def embedding_cache_stats():
+    # 모니터링용 hit/miss 카운터
+    return dict(get_embedding_cache().stats)
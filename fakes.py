@@ -0,0 +1,79 @@
+"""
+네트워크/API 키 없이 돌릴 수 있는 가짜 임베딩과 가짜 채팅 모델.
+부하 테스트나 벤치마크에서 MBTIChatBot(embeddings=..., llm=...)으로 주입해서 쓴다.
+"""
+import asyncio
+import hashlib
+import random
+import time
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeEmbeddings(Embeddings):
+    """텍스트 해시로 만든 결정적인 벡터. 같은 텍스트 -> 항상 같은 벡터."""
+
+    def __init__(self, size=1536):
+        self.size = size
+        self.model = f"fake-embedding-{size}"
+
+    def _embed(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0, 1) for _ in range(self.size)]
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    고정된 답변을 돌려주는 가짜 LLM.
+    latency초 뒤에 첫 토큰이 나오고, 그 뒤로는 초당 tokens_per_second개씩 글자 단위로 나온다.
+    tokens_per_second가 0이면 첫 토큰 뒤로는 기다리지 않음.
+    """
+
+    response: str = "응 그거 완전 좋아! 나도 그런 거 진짜 좋아해 ㅎㅎ"
+    latency: float = 0.2
+    tokens_per_second: float = 0.0
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _token_delay(self):
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def _result(self):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency + self._token_delay() * (len(self.response) - 1))
+        return self._result()
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency + self._token_delay() * (len(self.response) - 1))
+        return self._result()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for i, char in enumerate(self.response):
+            if i and self.tokens_per_second:
+                time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=char))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for i, char in enumerate(self.response):
+            if i and self.tokens_per_second:
+                await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=char))
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+
+
+from config import SHARED_DB_PATH
+
+MANIFEST_NAME = "manifest.json"
+# chroma.py로 교체한 스토어는 "<스토어 경로>.current" 파일에 지금 쓰는 버전 디렉터리 이름이 들어 있음
+POINTER_SUFFIX = ".current"
+# 청크 나누는 방식이 바뀌면 올려서, txt가 그대로여도 다시 동기화되게 함
+CHUNKING_VERSION = "qa-line-v1"
+
+
+def parse_qa_line(line):
+    # "Q: 질문A: 답변" 한 줄을 (질문, 답변)으로 나눔. 형식이 다르면 (None, None)
+    line = line.strip()
+    if not line.startswith("Q:") or "A:" not in line:
+        return None, None
+    question, _, answer = line[2:].partition("A:")
+    return question.strip(), answer.strip()
+
+
+def load_qa_documents(txt_path):
+    """
+    txt의 Q/A 한 줄을 문서 하나로 만든다. 길이로 자르지 않으므로
+    질문과 답변이 서로 다른 청크로 갈라지는 일이 없다.
+    질문은 metadata["question"]에 따로 담아 어휘 인덱스에서 쓴다.
+    """
+    # 적재/검색할 때만 필요하므로 모듈 상단에서는 import하지 않음
+    from langchain_core.documents import Document
+
+    docs = []
+    with open(txt_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            question, _ = parse_qa_line(line)
+            metadata = {"source": txt_path}
+            if question:
+                metadata["question"] = question
+            docs.append(Document(page_content=line, metadata=metadata))
+    return docs
+
+
+def store_dir(path):
+    # 포인터 파일이 있으면 그게 가리키는 버전 디렉터리, 없으면 원래 경로 그대로
+    pointer = path + POINTER_SUFFIX
+    if not os.path.isfile(pointer):
+        return path
+    with open(pointer, encoding="utf-8") as f:
+        return os.path.join(os.path.dirname(path), f.read().strip())
+
+
+def has_store_files(path):
+    # Chroma는 없는 경로를 열면 빈 스토어(chroma.sqlite3)를 만들어 버리므로, 읽기만 할 때는 먼저 확인
+    return os.path.isfile(os.path.join(path, "chroma.sqlite3"))
+
+
+def shared_manifest_path(mbti):
+    return os.path.join(store_dir(SHARED_DB_PATH), f"{mbti}_manifest.json")
+
+
+def chunk_id(text, mbti=None):
+    # 청크 내용으로부터 결정적인 id 생성 (같은 텍스트 -> 같은 id)
+    # 통합 스토어에서는 유형끼리 id가 겹치지 않도록 mbti를 앞에 붙임
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{mbti}-{digest}" if mbti else digest
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest_path, manifest):
+    # 임시 파일에 쓴 뒤 교체해서 중간에 죽어도 manifest가 깨지지 않게 함
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _adopt_legacy_rows(db, wanted, mbti=None):
+    # manifest 이전에 만들어진 스토어(uuid id, 중복 행)를 정리
+    # 이미 임베딩된 텍스트는 content-hash id로 옮겨서 다시 임베딩하지 않음
+    where = {"mbti": mbti} if mbti else None
+    existing = db.get(where=where, include=["documents", "metadatas", "embeddings"])
+    adopted = set()
+    ids, embeddings, documents, metadatas = [], [], [], []
+    for row_id, text, meta, emb in zip(
+        existing["ids"], existing["documents"], existing["metadatas"], existing["embeddings"]
+    ):
+        cid = chunk_id(text, mbti)
+        if cid in wanted and cid not in adopted and row_id != cid:
+            ids.append(cid)
+            embeddings.append(emb)
+            documents.append(text)
+            metadatas.append(meta or {})
+        if cid in wanted:
+            adopted.add(cid)
+
+    stale = [row_id for row_id in existing["ids"] if row_id not in wanted]
+    if ids:
+        db._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    if stale:
+        db.delete(ids=stale)
+    return adopted
+
+
+def sync_documents(db, docs, manifest_path, source_hash=None, mbti=None):
+    """
+    docs를 db와 맞춘다. 새로 생긴 청크만 임베딩해서 추가하고,
+    txt에서 사라진 청크는 삭제한다. 바뀐 게 없으면 임베딩 호출 없음.
+    mbti를 주면 통합 스토어용으로 id에 접두어를, metadata에 mbti를 붙인다.
+    반환값: (추가된 개수, 삭제된 개수)
+    """
+    manifest = load_manifest(manifest_path)
+
+    current = {}
+    for doc in docs:
+        if mbti:
+            doc.metadata["mbti"] = mbti
+        current.setdefault(chunk_id(doc.page_content, mbti), doc)
+
+    if manifest is None:
+        known = _adopt_legacy_rows(db, set(current), mbti)
+    else:
+        known = set(manifest["ids"])
+
+    new_ids = [cid for cid in current if cid not in known]
+    removed_ids = [cid for cid in known if cid not in current]
+
+    if new_ids:
+        db.add_documents([current[cid] for cid in new_ids], ids=new_ids)
+    if removed_ids:
+        db.delete(ids=removed_ids)
+
+    save_manifest(manifest_path, {
+        "source_hash": source_hash, "chunking": CHUNKING_VERSION, "ids": list(current),
+    })
+    return len(new_ids), len(removed_ids)
+
+
+def is_up_to_date(manifest_path, source_hash):
+    # 원본 txt 해시가 같으면 분할/임베딩 없이 바로 건너뜀
+    manifest = load_manifest(manifest_path)
+    return (
+        manifest is not None
+        and manifest.get("source_hash") == source_hash
+        and manifest.get("chunking") == CHUNKING_VERSION
+    )
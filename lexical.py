@@ -0,0 +1,103 @@
+"""
+Q/A 코퍼스용 인메모리 어휘 인덱스.
+한국어는 띄어쓰기/조사 때문에 단어 단위 매칭이 잘 안 맞아서 글자 n-gram으로 BM25를 계산한다.
+- search(): 벡터 검색 결과와 합칠 BM25 순위
+- match_question(): 저장된 질문과 거의 같은 질문이면 그 Q/A를 바로 돌려줌 (임베딩 호출 생략)
+"""
+import math
+import unicodedata
+from collections import Counter
+
+from config import TXT_PATHS
+from ingest import load_qa_documents
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFC", text).lower()
+    # 공백과 문장부호는 비교에서 뺌
+    return "".join(c for c in text if c.isalnum())
+
+
+def char_ngrams(text, n_values=(2, 3)):
+    text = _normalize(text)
+    grams = []
+    for n in n_values:
+        if len(text) < n:
+            continue
+        grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams or ([text] if text else [])
+
+
+class BM25Index:
+    def __init__(self, docs, k1=1.5, b=0.75):
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(char_ngrams(doc.page_content)) for doc in docs]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if docs else 0.0
+        doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(docs)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+        # 질문 완전일치 비교용 n-gram 집합
+        self.question_grams = [
+            set(char_ngrams(doc.metadata.get("question", doc.page_content))) for doc in docs
+        ]
+
+    def search(self, query, k=10):
+        terms = Counter(char_ngrams(query))
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1.0))
+            score = 0.0
+            for term, q_count in terms.items():
+                freq = tf.get(term)
+                if freq:
+                    score += q_count * self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((score, i))
+        scores.sort(key=lambda x: -x[0])
+        return [(self.docs[i], score) for score, i in scores[:k]]
+
+    def match_question(self, query, threshold):
+        # 질문끼리 글자 n-gram Dice 유사도가 threshold 이상이면 가장 비슷한 것 반환
+        grams = set(char_ngrams(query))
+        if not grams:
+            return None
+        best, best_score = None, threshold
+        for doc, q_grams in zip(self.docs, self.question_grams):
+            if not q_grams:
+                continue
+            score = 2 * len(grams & q_grams) / (len(grams) + len(q_grams))
+            if score >= best_score:
+                best, best_score = doc, score
+        return best
+
+
+def reciprocal_rank_fusion(result_lists, k, rrf_k=60):
+    # 여러 검색 결과의 순위를 합침. 같은 내용의 문서는 하나로 봄
+    scores = {}
+    docs = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results):
+            key = doc.page_content
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    ranked = sorted(scores, key=lambda key: -scores[key])
+    return [docs[key] for key in ranked[:k]]
+
+
+_indexes = {}
+
+
+def get_lexical_index(mbti):
+    # 원본 txt에서 바로 만들기 때문에 벡터 스토어를 열 필요가 없음
+    if mbti not in _indexes:
+        _indexes[mbti] = BM25Index(load_qa_documents(TXT_PATHS[mbti]))
+    return _indexes[mbti]
+
+
+def invalidate_lexical_index(mbti):
+    _indexes.pop(mbti, None)
@@ -22,6 +22,9 @@ while True:
     if query.lower() in ["exit", "quit"]:
         print("대화를 종료합니다.")
         break
-    response = chatbot.get_response(query)
-    print(f"({selected_mbti.upper()}) 답변: {response}")
+    print(f"({selected_mbti.upper()}) 답변: ", end="", flush=True)
+    for token in chatbot.stream_response(query):
+        print(token, end="", flush=True)
+    timing = chatbot.last_timing
+    print(f"\n  [첫 토큰 {timing['ttft']:.2f}s / 전체 {timing['total']:.2f}s]")
     
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+세션별 대화 기록.
+- 모든 턴은 세션 로그 파일(jsonl)에 append만 한다. 재시작하면 여기서 다시 읽음.
+- 프롬프트에는 최근 턴을 토큰 예산 안에서만 넣고,
+  예산 밖으로 밀려난 오래된 턴은 현재 질문과 임베딩이 비슷한 것 몇 개만 골라 넣는다.
+그래서 대화가 아무리 길어져도 프롬프트 크기(= LLM 지연/비용)는 일정하게 유지된다.
+"""
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from config import MEMORY_RECALL_K, MEMORY_RECALL_TOKEN_BUDGET, MEMORY_TOKEN_BUDGET
+from utils import count_tokens
+
+
+def format_turn(turn):
+    return f"Q: {turn['query']}\nA: {turn['answer']}"
+
+
+class ConversationMemory:
+    def __init__(self, log_path, embeddings, token_budget=MEMORY_TOKEN_BUDGET,
+                 recall_budget=MEMORY_RECALL_TOKEN_BUDGET, recall_k=MEMORY_RECALL_K):
+        self.log_path = log_path
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.recall_budget = recall_budget
+        self.recall_k = recall_k
+        self.window = []  # 최근 턴 (토큰 예산 안)
+        self.window_tokens = 0
+        self.archive = []  # 예산 밖으로 밀려난 턴
+        self.archive_vectors = []  # archive 순서대로의 임베딩 (아직 안 만든 건 없음)
+
+        if os.path.exists(log_path):
+            with open(log_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._push(json.loads(line))
+
+    def __len__(self):
+        return len(self.window) + len(self.archive)
+
+    def _fit(self, turn):
+        # 한 턴만으로 예산을 넘으면 프롬프트에 넣을 텍스트를 잘라서 예산을 지킴 (로그 파일은 원문 그대로)
+        for field in ("answer", "query"):
+            while turn["tokens"] > self.token_budget and turn[field]:
+                keep = int(len(turn[field]) * self.token_budget / turn["tokens"]) - 1
+                turn[field] = turn[field][:keep] + "…" if keep > 0 else ""
+                turn["tokens"] = count_tokens(format_turn(turn))
+
+    def _push(self, turn):
+        turn["tokens"] = count_tokens(format_turn(turn))
+        if turn["tokens"] > self.token_budget:
+            self._fit(turn)
+        self.window.append(turn)
+        self.window_tokens += turn["tokens"]
+        # 최소 한 턴은 남기고 (_fit으로 예산 안에 들어옴), 예산을 넘으면 오래된 턴부터 archive로 보냄
+        while self.window_tokens > self.token_budget and len(self.window) > 1:
+            old = self.window.pop(0)
+            self.window_tokens -= old["tokens"]
+            self.archive.append(old)
+
+    def _append(self, turn):
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+
+    def add_turn(self, query, answer):
+        turn = {"query": query, "answer": answer}
+        self._append(turn)
+        self._push(turn)
+
+    async def aadd_turn(self, query, answer):
+        # 서버에서는 파일 쓰기가 이벤트 루프를 막지 않도록 스레드에서 처리
+        turn = {"query": query, "answer": answer}
+        await asyncio.get_running_loop().run_in_executor(None, self._append, turn)
+        self._push(turn)
+
+    def _pending_texts(self):
+        # 아직 임베딩이 없는 archive 턴은 한 번에 모아서 임베딩
+        return [format_turn(t) for t in self.archive[len(self.archive_vectors):]]
+
+    def _recall(self, query):
+        if not self.archive or self.recall_k <= 0:
+            return []
+        pending = self._pending_texts()
+        if pending:
+            self.archive_vectors.extend(self.embeddings.embed_documents(pending))
+        return self._select(self.embeddings.embed_query(query))
+
+    async def _arecall(self, query):
+        if not self.archive or self.recall_k <= 0:
+            return []
+        start = len(self.archive_vectors)
+        pending = self._pending_texts()
+        if pending:
+            vectors = await self.embeddings.aembed_documents(pending)
+            # 기다리는 동안 같은 세션의 다른 요청이 먼저 채웠을 수 있으므로 위치를 지정해서 넣음
+            self.archive_vectors[start:start + len(vectors)] = vectors
+        return self._select(await self.embeddings.aembed_query(query))
+
+    def _select(self, query_embedding):
+        matrix = np.asarray(self.archive_vectors, dtype=np.float32)
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query_vector) or 1.0)
+        norms[norms == 0] = 1.0
+        scores = (matrix @ query_vector) / norms
+
+        recalled, used = [], 0
+        for i in np.argsort(-scores)[:self.recall_k]:
+            turn = self.archive[int(i)]
+            if used + turn["tokens"] > self.recall_budget:
+                continue
+            recalled.append(int(i))
+            used += turn["tokens"]
+        # 원래 대화 순서대로 보여줌
+        return [self.archive[i] for i in sorted(recalled)]
+
+    def _format(self, recalled):
+        parts = [format_turn(t) for t in recalled]
+        if recalled:
+            parts.append("...")
+        parts.extend(format_turn(t) for t in self.window)
+        return "\n".join(parts)
+
+    def render(self, query):
+        return self._format(self._recall(query))
+
+    async def arender(self, query):
+        # 서버용: 임베딩 호출(aembed_*)이 이벤트 루프를 막지 않음
+        return self._format(await self._arecall(query))
@@ -0,0 +1,105 @@
+"""
+Chroma 대신 쓸 수 있는 인메모리 검색 엔진.
+유형별 코퍼스가 수십 줄 수준이라 임베딩 전체를 float32 행렬 하나로 올려두고
+유사도 검색과 MMR을 NumPy 배치 연산으로 처리한다.
+결과는 Chroma 경로(l2 거리로 fetch_k 후보 -> 코사인 MMR)와 같게 맞춰져 있다.
+"""
+import numpy as np
+from langchain.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from config import EMBEDDING_DB_PATH, SHARED_COLLECTION_NAME, SHARED_DB_PATH, USE_SHARED_DB
+from ingest import store_dir
+
+
+class NumpyIndex:
+    def __init__(self, embeddings, documents, metadatas):
+        if embeddings is None or len(embeddings) == 0:
+            # 빈 스토어: 1차원 배열이 되지 않도록 (0, 0) 행렬로 둠
+            embeddings = np.empty((0, 0), dtype=np.float32)
+        self.matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        norms = np.sqrt(self.sq_norms)
+        norms[norms == 0] = 1.0
+        self.unit = self.matrix / norms[:, None]
+        self.documents = documents
+        self.metadatas = [meta or {} for meta in metadatas]
+        self.mbti_labels = np.array([meta.get("mbti", "") for meta in self.metadatas])
+
+    def __len__(self):
+        return len(self.documents)
+
+    @classmethod
+    def from_chroma(cls, db, where=None):
+        rows = db.get(where=where, include=["documents", "metadatas", "embeddings"])
+        return cls(rows["embeddings"], rows["documents"], rows["metadatas"])
+
+    def _candidates(self, query, fetch_k, mbti=None):
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp)
+        # Chroma 기본 공간(l2)과 같은 순서: ||x||^2 - 2x·q (||q||^2은 순위에 영향 없음)
+        dist = self.sq_norms - 2.0 * (self.matrix @ query)
+        if mbti is not None:
+            dist = np.where(self.mbti_labels == mbti, dist, np.inf)
+        fetch_k = min(fetch_k, int(np.isfinite(dist).sum()))
+        if fetch_k == 0:
+            return np.empty(0, dtype=np.intp)
+        top = np.argpartition(dist, fetch_k - 1)[:fetch_k]
+        return top[np.argsort(dist[top], kind="stable")]
+
+    def similarity_search_by_vector(self, embedding, k=4, mbti=None):
+        query = np.asarray(embedding, dtype=np.float32)
+        return self._to_docs(self._candidates(query, k, mbti))
+
+    def max_marginal_relevance_search_by_vector(
+        self, embedding, k=4, fetch_k=20, lambda_mult=0.5, mbti=None
+    ):
+        query = np.asarray(embedding, dtype=np.float32)
+        candidates = self._candidates(query, fetch_k, mbti)
+        if len(candidates) == 0:
+            return []
+
+        unit = self.unit[candidates]
+        q_norm = np.linalg.norm(query) or 1.0
+        query_sim = unit @ (query / q_norm)
+        pair_sim = unit @ unit.T  # 후보끼리 코사인 유사도를 한 번에 계산
+
+        selected = [int(np.argmax(query_sim))]
+        max_sim_to_selected = pair_sim[selected[0]].copy()
+        remaining = np.ones(len(candidates), dtype=bool)
+        remaining[selected[0]] = False
+        while len(selected) < min(k, len(candidates)):
+            scores = lambda_mult * query_sim - (1 - lambda_mult) * max_sim_to_selected
+            scores[~remaining] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            remaining[best] = False
+            np.maximum(max_sim_to_selected, pair_sim[best], out=max_sim_to_selected)
+
+        return self._to_docs(candidates[selected])
+
+    def _to_docs(self, indices):
+        return [
+            Document(page_content=self.documents[i], metadata=self.metadatas[i])
+            for i in indices
+        ]
+
+
+# 유형별 인덱스 캐시. 통합 스토어를 쓰면 전체를 한 번만 올리고 mbti로 마스킹
+_indexes = {}
+
+
+def get_numpy_index(mbti):
+    key = "__shared__" if USE_SHARED_DB else mbti
+    if key not in _indexes:
+        if USE_SHARED_DB:
+            db = Chroma(collection_name=SHARED_COLLECTION_NAME, persist_directory=store_dir(SHARED_DB_PATH))
+        else:
+            db = Chroma(persist_directory=store_dir(f"{EMBEDDING_DB_PATH}{mbti}_chroma_db"))
+        _indexes[key] = NumpyIndex.from_chroma(db)
+    return _indexes[key]
+
+
+def invalidate_numpy_index(mbti):
+    # 스토어가 갱신되면 다음 검색 때 다시 읽어오도록 캐시를 비움
+    _indexes.pop("__shared__" if USE_SHARED_DB else mbti, None)
@@ -0,0 +1,87 @@
+"""
+LLM 앞단의 의미 기반 응답 캐시.
+(mbti, 모델, temperature, 프롬프트 버전)이 같은 범위 안에서
+질문 임베딩의 코사인 유사도가 임계값 이상인 이전 답변이 있으면 그대로 돌려준다.
+TTL이 지난 항목은 무시하고, 개수가 한도를 넘으면 가장 오래 안 쓴 것부터 버린다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL
+
+
+class SemanticResponseCache:
+    def __init__(self, threshold=RESPONSE_CACHE_THRESHOLD, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (namespace, 순번) -> {"vector", "answer", "created_at", "latency"}
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._next_id = 0
+        self.stats = {"hits": 0, "misses": 0, "latency_saved": 0.0}
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, namespace, embedding):
+        query = self._unit(embedding)
+        now = time.time()
+        with self.lock:
+            best_key, best_score = None, self.threshold
+            for key, entry in list(self.entries.items()):
+                if now - entry["created_at"] > self.ttl:
+                    del self.entries[key]
+                    continue
+                if key[0] != namespace:
+                    continue
+                score = float(entry["vector"] @ query)
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                self.stats["misses"] += 1
+                return None
+            entry = self.entries[best_key]
+            self.entries.move_to_end(best_key)
+            self.stats["hits"] += 1
+            self.stats["latency_saved"] += entry["latency"]
+            return entry["answer"]
+
+    def store(self, namespace, embedding, answer, latency):
+        with self.lock:
+            self.entries[(namespace, self._next_id)] = {
+                "vector": self._unit(embedding),
+                "answer": answer,
+                "created_at": time.time(),
+                "latency": latency,
+            }
+            self._next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def report(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / total if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+# 모든 챗봇이 같은 캐시를 공유 (namespace에 mbti가 들어가므로 섞이지 않음)
+_cache = None
+
+
+def get_response_cache():
+    global _cache
+    if _cache is None:
+        _cache = SemanticResponseCache()
+    return _cache
@@ -0,0 +1,165 @@
+"""
+asyncio 기반 HTTP/SSE 서버.
+시작할 때 MBTI_FEATURES의 모든 유형에 대해 챗봇을 하나씩 미리 만들어 두고,
+여러 사용자의 요청을 동시에 처리한다. 동시에 도는 LLM 호출 수는 세마포어로 제한
+(요청 수가 아니라 실제 LLM 호출만 셈. single-flight 합류나 캐시 히트는 기다리지 않음).
+
+  POST /chat   {"mbti": "infp", "query": "...", "session_id": "..."}
+               session_id가 없으면 대화 기록 없이 답변 (기본 세션 파일을 여러 사용자가 같이 쓰지 않도록)
+               -> text/event-stream 으로 토큰을 하나씩 보냄 (끝나면 event: done, 실패하면 event: error)
+  GET  /health -> {"status": "ok", "bots": [...]}
+  GET  /metrics -> 단계별 지연 히스토그램 (TRACE_SINK = "prometheus"일 때)
+
+실행: python server.py --port 8000
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from chatbot import MBTIChatBot
+from config import MAX_CONCURRENT_LLM_CALLS, MBTI_FEATURES
+from tracing import get_sink
+
+logger = logging.getLogger("mbti.server")
+
+
+class BotPool:
+    def __init__(self, bot_factory=MBTIChatBot, initialize=True, warm=True):
+        # 유형마다 챗봇 하나씩 미리 띄워둠 (요청마다 새로 만들지 않음)
+        # warm: 스토어/LLM 클라이언트/검색 인덱스까지 미리 올려서 첫 요청이 느리지 않게 함
+        self.bots = {}
+        for mbti in MBTI_FEATURES:
+            bot = bot_factory(mbti)
+            if initialize:
+                bot.initialize_db()
+            if warm:
+                bot.warm()
+            self.bots[mbti] = bot
+
+    def get(self, mbti):
+        return self.bots.get(mbti)
+
+
+class ChatServer:
+    def __init__(self, pool, max_concurrent=MAX_CONCURRENT_LLM_CALLS):
+        self.pool = pool
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        for bot in pool.bots.values():
+            bot.llm_limiter = self.semaphore
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("utf-8") + body
+        )
+        await writer.drain()
+
+    async def _send_metrics(self, writer):
+        sink = get_sink()
+        if not hasattr(sink, "render"):
+            await self._send_json(writer, "404 Not Found", {"error": "TRACE_SINK가 prometheus가 아니야"})
+            return
+        body = sink.render().encode("utf-8")
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            + f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("utf-8") + body
+        )
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        if not request_line:
+            return None, None, None
+        # 형식이 틀린 요청줄/헤더는 ValueError -> handle에서 400으로 응답
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        return method, path, body
+
+    async def _chat(self, writer, payload):
+        mbti = payload.get("mbti") if isinstance(payload, dict) else None
+        bot = self.pool.get(mbti.lower()) if isinstance(mbti, str) else None
+        query = payload.get("query") if bot is not None else None
+        if bot is None or not query:
+            await self._send_json(writer, "400 Bad Request", {"error": "mbti와 query가 필요해"})
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        try:
+            session_id = payload.get("session_id")
+            stream = bot.astream_response(query, session_id, use_history=session_id is not None)
+            async for token in stream:
+                data = json.dumps({"token": token}, ensure_ascii=False)
+                writer.write(f"data: {data}\n\n".encode("utf-8"))
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            raise
+        except Exception as e:
+            # 200 헤더는 이미 나갔으므로 스트림 안에서 실패를 알림 (자세한 내용은 서버 로그에만)
+            logger.exception("응답 생성 실패 (mbti=%s)", bot.mbti)
+            error = json.dumps({"error": "답변을 만드는 중에 오류가 났어", "type": type(e).__name__}, ensure_ascii=False)
+            writer.write(f"event: error\ndata: {error}\n\n".encode("utf-8"))
+            await writer.drain()
+            return
+        done = json.dumps({"session_id": payload.get("session_id")}, ensure_ascii=False)
+        writer.write(f"event: done\ndata: {done}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+            except ValueError:
+                await self._send_json(writer, "400 Bad Request", {"error": "요청 형식이 잘못됐어"})
+                return
+            if method == "GET" and path == "/health":
+                await self._send_json(writer, "200 OK", {"status": "ok", "bots": list(self.pool.bots)})
+            elif method == "GET" and path == "/metrics":
+                await self._send_metrics(writer)
+            elif method == "POST" and path == "/chat":
+                try:
+                    payload = json.loads(body or b"{}")
+                except json.JSONDecodeError:
+                    await self._send_json(writer, "400 Bad Request", {"error": "JSON 형식이 아니야"})
+                    return
+                await self._chat(writer, payload)
+            elif method is not None:
+                await self._send_json(writer, "404 Not Found", {"error": "없는 경로야"})
+        except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            # 응답을 보내기 전에 난 예외. asyncio의 처리되지 않은 콜백 에러로 남지 않게 여기서 기록
+            logger.exception("요청 처리 실패")
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8000):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host, port, max_concurrent):
+    server = await ChatServer(BotPool(), max_concurrent).start(host, port)
+    print(f"MBTI 챗봇 서버 시작: http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 챗봇 HTTP/SSE 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_LLM_CALLS)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.max_concurrent))
@@ -0,0 +1,109 @@
+import argparse
+import os
+
+from config import EMBEDDING_DB_PATH, SHARED_COLLECTION_NAME, SHARED_DB_PATH, TXT_PATHS
+from ingest import (
+    MANIFEST_NAME, chunk_id, file_hash, is_up_to_date, load_manifest, load_qa_documents,
+    save_manifest, shared_manifest_path, store_dir, sync_documents,
+)
+
+
+# 프로세스 안에서 통합 스토어 클라이언트는 하나만 열어서 모든 챗봇이 같이 씀
+_shared_db = None
+_shared_path = None
+
+
+def get_shared_db(embeddings):
+    global _shared_db, _shared_path
+    # chroma.py로 스토어가 교체됐으면 새 버전 디렉터리로 다시 엶
+    path = store_dir(SHARED_DB_PATH)
+    if _shared_db is None or path != _shared_path:
+        from langchain.vectorstores import Chroma
+
+        _shared_db = Chroma(
+            collection_name=SHARED_COLLECTION_NAME,
+            persist_directory=path,
+            embedding_function=embeddings,
+        )
+        _shared_path = path
+    return _shared_db
+
+
+def build_shared_db(embeddings, mbti_list=None):
+    # TXT_PATHS의 모든 유형을 통합 컬렉션에 동기화 (바뀐 청크만 임베딩)
+    db = get_shared_db(embeddings)
+    for mbti in mbti_list or TXT_PATHS:
+        txt_path = TXT_PATHS[mbti]
+        source_hash = file_hash(txt_path)
+        manifest_path = shared_manifest_path(mbti)
+        if is_up_to_date(manifest_path, source_hash):
+            continue
+        added, removed = sync_documents(
+            db, load_qa_documents(txt_path), manifest_path, source_hash, mbti=mbti
+        )
+        print(f"{mbti}: {added}개 추가, {removed}개 삭제")
+    return db
+
+
+def migrate_per_type_stores(mbti_list=None):
+    """
+    기존 data/embedding/<mbti>_chroma_db 스토어들을 통합 컬렉션으로 옮긴다.
+    저장돼 있던 임베딩을 그대로 복사하므로 임베딩 API는 호출하지 않는다.
+    """
+    from langchain.vectorstores import Chroma
+
+    shared = Chroma(collection_name=SHARED_COLLECTION_NAME, persist_directory=store_dir(SHARED_DB_PATH))
+    for mbti in mbti_list or TXT_PATHS:
+        persist_directory = store_dir(f"{EMBEDDING_DB_PATH}{mbti}_chroma_db")
+        if not os.path.isdir(persist_directory):
+            print(f"{mbti}: 스토어 없음, 건너뜀")
+            continue
+
+        source = Chroma(persist_directory=persist_directory)
+        rows = source.get(include=["documents", "metadatas", "embeddings"])
+
+        # 같은 텍스트가 여러 번 들어가 있던 행은 하나로 합침
+        merged = {}
+        for text, meta, emb in zip(rows["documents"], rows["metadatas"], rows["embeddings"]):
+            meta = dict(meta or {})
+            meta["mbti"] = mbti
+            merged.setdefault(chunk_id(text, mbti), (text, meta, emb))
+
+        if merged:
+            ids = list(merged)
+            shared._collection.upsert(
+                ids=ids,
+                documents=[merged[i][0] for i in ids],
+                metadatas=[merged[i][1] for i in ids],
+                embeddings=[merged[i][2] for i in ids],
+            )
+
+        # 원본 manifest의 txt 해시를 이어받아야 다음 initialize_db가 바로 끝남
+        old_manifest = load_manifest(os.path.join(persist_directory, MANIFEST_NAME)) or {}
+        save_manifest(
+            shared_manifest_path(mbti),
+            {
+                "source_hash": old_manifest.get("source_hash"),
+                "chunking": old_manifest.get("chunking"),
+                "ids": list(merged),
+            },
+        )
+        print(f"{mbti}: {len(rows['ids'])}행 -> {len(merged)}행 이전 완료")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MBTI 통합 벡터 스토어 관리")
+    parser.add_argument("command", choices=["migrate", "build"])
+    parser.add_argument("--mbti", nargs="*", help="대상 유형 (기본: 전체)")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate_per_type_stores(args.mbti)
+    elif args.command == "build":
+        from langchain.embeddings.openai import OpenAIEmbeddings
+        from dotenv import load_dotenv
+        from embedding_cache import CachedEmbeddings
+
+        load_dotenv()
+        embeddings = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")))
+        build_shared_db(embeddings, args.mbti)
@@ -0,0 +1,81 @@
+"""
+같은 키의 요청이 동시에 여러 개 들어오면 실제 작업은 한 번만 돌리고 결과를 나눠 주는 single-flight.
+스트리밍은 먼저 온 요청이 만든 토큰을 버퍼에 쌓고, 나중에 합류한 요청도
+처음 토큰부터 자기만의 스트림으로 받아간다.
+"""
+import asyncio
+
+
+class _Flight:
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self.changed = asyncio.Condition()
+
+    async def push(self, token):
+        async with self.changed:
+            self.tokens.append(token)
+            self.changed.notify_all()
+
+    async def close(self, error=None):
+        async with self.changed:
+            self.done = True
+            self.error = error
+            self.changed.notify_all()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: index < len(self.tokens) or self.done)
+                pending = self.tokens[index:]
+                done, error = self.done, self.error
+            for token in pending:
+                yield token
+            index += len(pending)
+            if done and index >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}  # key -> asyncio.Task (결과 한 번에)
+        self.streams = {}  # key -> _Flight (토큰 스트림)
+
+    async def do(self, key, make_coro):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(make_coro())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        # 한 호출자가 취소돼도 다른 호출자가 기다리는 작업은 계속 돌도록 shield
+        return await asyncio.shield(task)
+
+    def stream(self, key, make_stream):
+        flight = self.streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            self.streams[key] = flight
+
+            async def run():
+                error = None
+                try:
+                    async for token in make_stream():
+                        await flight.push(token)
+                except asyncio.CancelledError:
+                    error = RuntimeError("single-flight 스트림이 취소됨")
+                    raise
+                except Exception as e:
+                    error = e
+                finally:
+                    # 취소(BaseException)로 끝나더라도 구독자들이 영원히 기다리지 않도록 항상 닫음
+                    self.streams.pop(key, None)
+                    await flight.close(error)
+
+            # 첫 요청자가 중간에 끊어도 나머지를 위해 끝까지 돌도록 별도 task로 실행
+            flight.task = asyncio.ensure_future(run())
+        return flight.subscribe()
@@ -0,0 +1,152 @@
+"""
+get_response 한 턴을 단계별로 재는 계측.
+단계(span)마다 걸린 시간과 프롬프트/답변 토큰 수, 검색 문서 수, 캐시 상태를 모아서
+설정된 sink로 넘긴다.
+
+  TRACE_SINK = None          -> 계측 끔 (no-op 객체만 오가서 오버헤드 거의 없음)
+  TRACE_SINK = "log"         -> 턴마다 JSON 한 줄을 logging으로 출력
+  TRACE_SINK = "prometheus"  -> 유형별 히스토그램 누적, render()로 텍스트 노출 (server.py의 /metrics)
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from config import TRACE_SINK
+
+logger = logging.getLogger("mbti.trace")
+
+# 지연 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTrace:
+    enabled = False
+    _span = _NullSpan()
+
+    def span(self, name):
+        return self._span
+
+    def set(self, **attrs):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class Trace:
+    enabled = True
+
+    def __init__(self, mbti, sink):
+        self.mbti = mbti
+        self.sink = sink
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.attrs = {}
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + time.perf_counter() - start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def finish(self):
+        self.spans["total"] = time.perf_counter() - self.start
+        self.sink.emit(self)
+
+
+class LogSink:
+    def emit(self, trace):
+        logger.info(json.dumps({
+            "mbti": trace.mbti,
+            "spans_ms": {name: round(sec * 1000, 3) for name, sec in trace.spans.items()},
+            **trace.attrs,
+        }, ensure_ascii=False))
+
+
+class PrometheusSink:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}  # (mbti, stage) -> [bucket counts..., +Inf count, sum]
+        self.counters = {}  # (name, mbti, label) -> 값
+
+    def _observe(self, key, value):
+        hist = self.histograms.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                hist[i] += 1
+        hist[len(self.buckets)] += 1
+        hist[-1] += value
+
+    def _inc(self, name, mbti, label, value=1):
+        key = (name, mbti, label)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def emit(self, trace):
+        with self.lock:
+            for stage, seconds in trace.spans.items():
+                self._observe((trace.mbti, stage), seconds)
+            self._inc("mbti_turns_total", trace.mbti, trace.attrs.get("cache", "off"))
+            for name in ("prompt_tokens", "completion_tokens", "retrieved_docs"):
+                if name in trace.attrs:
+                    self._inc(f"mbti_{name}_total", trace.mbti, "", trace.attrs[name])
+
+    def render(self):
+        lines = ["# TYPE mbti_stage_seconds histogram"]
+        typed = set()
+        with self.lock:
+            for (mbti, stage), hist in sorted(self.histograms.items()):
+                labels = f'mbti="{mbti}",stage="{stage}"'
+                for bound, count in zip(self.buckets, hist):
+                    lines.append(f'mbti_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'mbti_stage_seconds_bucket{{{labels},le="+Inf"}} {hist[len(self.buckets)]}')
+                lines.append(f"mbti_stage_seconds_sum{{{labels}}} {hist[-1]}")
+                lines.append(f"mbti_stage_seconds_count{{{labels}}} {hist[len(self.buckets)]}")
+            for (name, mbti, label), value in sorted(self.counters.items()):
+                if name not in typed:
+                    # 정렬돼 있어서 같은 이름의 줄은 모여 나옴. 이름마다 한 번씩 타입을 붙임
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                labels = f'mbti="{mbti}"' + (f',cache="{label}"' if label else "")
+                lines.append(f"{name}{{{labels}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_SINKS = {"log": LogSink, "prometheus": PrometheusSink}
+_sink = None
+
+
+def get_sink():
+    global _sink
+    if _sink is None and TRACE_SINK:
+        _sink = _SINKS[TRACE_SINK]()
+    return _sink
+
+
+def set_sink(sink):
+    # 직접 만든 sink(emit(trace) 메서드만 있으면 됨)를 꽂을 때 사용
+    global _sink
+    _sink = sink
+
+
+def start_trace(mbti):
+    sink = get_sink()
+    return NULL_TRACE if sink is None else Trace(mbti, sink)
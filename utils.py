@@ -1,22 +1,29 @@
-from langchain.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-def load_and_split_txt(txt_path, chunk_size=100, chunk_overlap=0):
-    # TXT 파일 로드
-    loader = TextLoader(txt_path, encoding="utf-8")
-    data = loader.load()
-
-    # 텍스트 분할기 초기화
-    text_splitter = RecursiveCharacterTextSplitter(
-        separators = '\n',
-        chunk_size = chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len
-    )
-    
-    # 텍스트 분할 후 반환
-    return text_splitter.split_documents(data)
+import unicodedata
+
+_encoding = None
+
 
 def format_docs(docs):
     # 도큐먼트 포맷팅
     return '\n\n'.join([d.page_content for d in docs])
+
+
+def normalize_text(text):
+    # 유니코드 정규화 + 앞뒤/연속 공백 정리
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def count_tokens(text):
+    # tiktoken은 처음 쓸 때 로드. 없으면 대략적으로 추정 (한국어는 글자당 1토큰 정도)
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            # 설치돼 있지 않거나, 인코딩 파일이 캐시에 없는데 네트워크가 없어서 받지 못한 경우
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text)